@@ -0,0 +1,142 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+from typing import Awaitable, Callable
+
+
+class AdaptiveConcurrency:
+    """
+    Ограничивает число одновременно обрабатываемых сообщений.
+
+    Лимит подстраивается под очередь ограничителя запросов: пока в ней
+    больше target_backlog секунд работы, лимит уменьшается на единицу,
+    когда очередь ниже половины цели - увеличивается до max_limit.
+
+    Ожидающие сообщения получают слот в порядке срока (earliest deadline
+    first), при равных сроках - в порядке прихода. on_change вызывается
+    с новым лимитом при каждом его изменении
+    """
+
+    def __init__(
+            self, max_limit: int, backlog: Callable[[], float],
+            target_backlog: float, min_limit: int = 1,
+            on_change: Callable[[int], None] | None = None,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = max_limit
+        self.backlog = backlog
+        self.target_backlog = target_backlog
+        self.on_change = on_change
+        self.active = 0
+        self._waiters = []
+        self._counter = itertools.count()
+
+    def _adjust(self):
+        backlog = self.backlog()
+        limit = self.limit
+        if backlog > self.target_backlog:
+            limit = max(self.min_limit, limit - 1)
+        elif backlog < self.target_backlog / 2:
+            limit = min(self.max_limit, limit + 1)
+        if limit != self.limit:
+            self.limit = limit
+            if self.on_change is not None:
+                self.on_change(limit)
+
+    def _wake(self):
+        while self._waiters and self.active < self.limit:
+            *_, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    async def acquire(self, deadline: float = math.inf):
+        """
+        Аргументы:
+            deadline (float): срок сообщения в шкале time.monotonic()
+        """
+        self._adjust()
+        if not self._waiters and self.active < self.limit:
+            self.active += 1
+            return self
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (deadline, next(self._counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.active -= 1
+                self._wake()
+            raise
+        return self
+
+    def release(self):
+        self.active -= 1
+        self._adjust()
+        self._wake()
+
+    async def __aenter__(self):
+        return await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class PrefetchSync:
+    """
+    Держит prefetch канала RabbitMQ вслед за лимитом AdaptiveConcurrency.
+
+    Сообщения сверх лимита иначе лежат неподтвержденными в памяти
+    процесса, пока их срок идет, и недоступны другим репликам. Prefetch -
+    лимит плюс extra сообщений для выбора по сроку, но не больше
+    max_prefetch. Изменения лимита склеиваются: фоновая задача применяет
+    только последнее
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+            self, set_prefetch: Callable[[int], Awaitable[None]],
+            max_prefetch: int, extra: int = 0,
+    ):
+        self.set_prefetch = set_prefetch
+        self.max_prefetch = max_prefetch
+        self.extra = extra
+        self.prefetch = None
+        self._limit = None
+        self._changed = asyncio.Event()
+        self._task = None
+
+    def prefetch_for(self, limit: int) -> int:
+        return max(1, min(self.max_prefetch, limit + self.extra))
+
+    def update(self, limit: int):
+        """Обработчик AdaptiveConcurrency.on_change"""
+        self._limit = limit
+        self._changed.set()
+
+    async def run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            prefetch = self.prefetch_for(self._limit)
+            if prefetch == self.prefetch:
+                continue
+            try:
+                await self.set_prefetch(prefetch)
+                self.prefetch = prefetch
+            except Exception as err:
+                self.logger.error(f"Не удалось изменить prefetch: {err!r}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,48 @@
+import datetime
+import time
+from typing import Callable
+
+from app.models import Income
+from clients.rate_limiter import LimiterFlow
+
+
+class DeadlinePolicy:
+    """
+    Срок обработки сообщения и ранний отказ.
+
+    Срок - date_to заказа, переведенный в time.monotonic(): позже нужных
+    поездов уже не забронировать. Сообщение отбрасывается до первого
+    запроса к Axenix, если его min_calls запросов не укладываются в срок.
+    Ожидание оценивает wait по справедливой доле потока в очереди
+    ограничителя: чужой длинный поток задерживает новое сообщение лишь на
+    свою долю, поэтому вся очередь для оценки не годится
+    """
+
+    def __init__(
+            self, wait: Callable[[int, LimiterFlow | None], float],
+            min_calls: int = 3,
+    ):
+        self.wait = wait
+        self.min_calls = min_calls
+        self.shed = 0
+        self.missed = 0
+
+    @staticmethod
+    def deadline(order_data: Income) -> float:
+        remaining = order_data.date_to_dt - datetime.datetime.now()
+        return time.monotonic() + remaining.total_seconds()
+
+    def estimate(self, flow: LimiterFlow | None = None) -> float:
+        """Сколько секунд займет обработка сообщения, взятого сейчас"""
+        return self.wait(self.min_calls, flow)
+
+    def should_shed(self, deadline: float, flow: LimiterFlow | None = None) -> bool:
+        if time.monotonic() + self.estimate(flow) <= deadline:
+            return False
+        self.shed += 1
+        return True
+
+    def record(self, deadline: float):
+        """Учитывает сообщения, обработка которых закончилась после срока"""
+        if time.monotonic() > deadline:
+            self.missed += 1
@@ -0,0 +1,74 @@
+import time
+
+
+class SeatLedger:
+    """
+    Краткоживущие заявки на места внутри процесса.
+
+    Сообщения, одновременно увидевшие одну схему вагона, иначе выбирают
+    одни и те же места и тратят лимитированные POST-запросы на заведомо
+    проигранную бронь. Выбранные места заявляются за сообщением до конца
+    его обработки; после успешной брони заявка подтверждается и еще
+    confirmed_ttl секунд скрывает места от устаревших схем
+    """
+
+    def __init__(self, claim_ttl: float = 120.0, confirmed_ttl: float = 60.0):
+        self.claim_ttl = claim_ttl
+        self.confirmed_ttl = confirmed_ttl
+        self._claims = {}
+        self._owners = {}
+        self._next_purge = 0.0
+
+    def claimed(self, train_id: int, wagon_id: int, owner) -> set[int]:
+        """Места вагона, заявленные другими сообщениями"""
+        seats = self._claims.get((train_id, wagon_id))
+        if not seats:
+            return set()
+        now = time.monotonic()
+        return {
+            seat_id
+            for seat_id, (claim_owner, expires) in seats.items()
+            if expires > now and claim_owner != id(owner)
+        }
+
+    def claim(self, train_id: int, wagon_id: int, seat_ids, owner):
+        self._purge()
+        expires = time.monotonic() + self.claim_ttl
+        seats = self._claims.setdefault((train_id, wagon_id), {})
+        keys = self._owners.setdefault(id(owner), set())
+        for seat_id in seat_ids:
+            seats[seat_id] = (id(owner), expires)
+            keys.add((train_id, wagon_id, seat_id))
+
+    def confirm(self, train_id: int, wagon_id: int, seat_ids, owner):
+        """Места забронированы: заявка больше не принадлежит сообщению"""
+        expires = time.monotonic() + self.confirmed_ttl
+        seats = self._claims.setdefault((train_id, wagon_id), {})
+        keys = self._owners.get(id(owner), set())
+        for seat_id in seat_ids:
+            seats[seat_id] = (None, expires)
+            keys.discard((train_id, wagon_id, seat_id))
+
+    def release_owner(self, owner):
+        """Снимает все неподтвержденные заявки сообщения"""
+        for train_id, wagon_id, seat_id in self._owners.pop(id(owner), ()):
+            seats = self._claims.get((train_id, wagon_id))
+            if seats is not None and seats.get(seat_id, (None,))[0] == id(owner):
+                del seats[seat_id]
+                if not seats:
+                    del self._claims[(train_id, wagon_id)]
+
+    def _purge(self):
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + min(self.claim_ttl, self.confirmed_ttl)
+        for key in list(self._claims):
+            seats = self._claims[key]
+            for seat_id in [
+                seat_id for seat_id, (_, expires) in seats.items()
+                if expires <= now
+            ]:
+                del seats[seat_id]
+            if not seats:
+                del self._claims[key]
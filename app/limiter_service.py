@@ -0,0 +1,61 @@
+"""
+Сервис, раздающий токены общего лимита нескольким репликам.
+
+Реплики с адаптивной скоростью сообщают в каждом запросе свою текущую
+оценку. Корзина ключа работает на минимуме из оценок, полученных за
+последние REPORT_TTL секунд: реплика, увидевшая перегрузку апстрима,
+притормаживает всех, а отчет последней реплики не перезаписывает
+скорость остальных. Реплика, переставшая ходить, перестает учитываться
+через REPORT_TTL
+
+Запуск: uvicorn app.limiter_service:app --port 8100
+"""
+import time
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from clients.limiter_backends import TokenBucket
+
+REPORT_TTL = 30.0
+
+app = FastAPI()
+buckets: dict[str, TokenBucket] = {}
+# ключ -> реплика -> (запросов в секунду, когда отчет устареет)
+reports: dict[str, dict[str, tuple[float, float]]] = {}
+
+
+class ReserveRequest(BaseModel):
+    key: str
+    rate: float
+    per: float = 1.0
+    burst: int = 1
+    replica: str = ""
+
+
+class ReserveResponse(BaseModel):
+    delay: float
+
+
+def agreed_rate(body: ReserveRequest, now: float) -> float:
+    """Минимум свежих оценок скорости по ключу, в запросах в секунду"""
+    key_reports = reports.setdefault(body.key, {})
+    key_reports[body.replica] = (body.rate / body.per, now + REPORT_TTL)
+    for replica in [
+        replica for replica, (_, expires) in key_reports.items()
+        if expires <= now
+    ]:
+        del key_reports[replica]
+    return min(rate for rate, _ in key_reports.values())
+
+
+@app.post("/reserve")
+async def reserve(body: ReserveRequest) -> ReserveResponse:
+    now = time.monotonic()
+    rate = agreed_rate(body, now)
+    bucket = buckets.get(body.key)
+    if bucket is None:
+        bucket = buckets[body.key] = TokenBucket(rate, 1.0, body.burst)
+    elif bucket.interval != 1.0 / rate:
+        bucket.set_rate(rate)
+    return ReserveResponse(delay=bucket.reserve(now))
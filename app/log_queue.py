@@ -0,0 +1,56 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Кладет записи в ограниченную очередь без блокировки event loop.
+    Если фоновый поток не успевает писать на диск, записи отбрасываются
+    и учитываются в счетчиках по уровням
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = {}
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+
+
+class _QueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # очередь может быть заполнена, ждем, пока поток ее разгребет
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+def setup_queue_logging(max_size: int) -> QueueListener:
+    """
+    Переносит обработчики корневого логгера в фоновый поток: в loop
+    остается только постановка записи в очередь
+
+    Аргументы:
+        max_size (int): максимальный размер очереди записей
+
+    Возвращает:
+        QueueListener: запущенный слушатель очереди
+    """
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    log_queue = queue.Queue(max_size)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    listener = _QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -1,50 +1,227 @@
 import asyncio
 import logging
 import sys
+import time
 from contextlib import asynccontextmanager
 
 from faststream import FastStream
-from faststream.rabbit import RabbitBroker
+from faststream.rabbit import Channel, RabbitBroker
 from faststream.exceptions import AckMessage, NackMessage
 
+from app.concurrency import AdaptiveConcurrency, PrefetchSync
+from app.deadline import DeadlinePolicy
+from app.metrics import create_server, message_seconds, registry
 from app.models import Income
+from app.outbox import Outbox
+from app.route_batcher import RouteBatcher
 from app.service import BookingService
 from app.settings import settings
+from app.tracing import tracer
 from clients.axenix import AxenixClient
 from clients.internal import InternalClient
+from clients.rate_limiter import RequestBudgetExceeded
+from clients.retry import CircuitOpenError
 
 settings.setup_architecture()
 settings.setup_logging()
+if settings.TRACE_ENABLED:
+    tracer.configure(
+        settings.TRACE_FILE, settings.TRACE_SAMPLE_RATE,
+        settings.TRACE_QUEUE_SIZE,
+    )
 
 service = BookingService(AxenixClient())
+batcher = RouteBatcher(service, settings.ROUTE_BATCH_WINDOW)
+outbox = Outbox(
+    settings.OUTBOX_DIR, InternalClient.save_new_order,
+    segment_size=settings.OUTBOX_SEGMENT_SIZE,
+    fsync_interval=settings.OUTBOX_FSYNC_INTERVAL,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    retry_max=settings.OUTBOX_RETRY_MAX,
+)
 logger = logging.getLogger(__name__)
 
-broker = RabbitBroker(url=settings.amqp_url)
-app = FastStream(broker)
+
+async def set_prefetch(count: int):
+    queue = subscriber._queue_obj
+    if queue is not None:
+        await queue.channel.set_qos(prefetch_count=count, global_=True)
+
+
+prefetch = PrefetchSync(
+    set_prefetch, settings.RMQ_PREFETCH, settings.RMQ_PREFETCH_EXTRA
+)
+gate = AdaptiveConcurrency(
+    settings.CONSUMER_MAX_CONCURRENCY, service.client.limiter_backlog,
+    settings.CONSUMER_TARGET_BACKLOG,
+    min_limit=settings.CONSUMER_MIN_CONCURRENCY,
+    on_change=prefetch.update,
+)
+deadlines = DeadlinePolicy(
+    service.client.limiter_wait, min_calls=settings.DEADLINE_MIN_CALLS,
+)
+
+
+
+def cache_stats() -> dict:
+    values = {}
+    for name, cache in (
+            ("trains", service.client.trains_cache),
+            ("wagons", service.client.wagons_cache),
+    ):
+        stats = cache.stats()
+        for result in ("hits", "misses", "coalesced"):
+            values[(name, result)] = stats[result]
+    return values
 
 
-@broker.subscriber(
-    queue=settings.RMQ_QUEUE
+registry.callback(
+    "axenix_rate", "Текущая скорость запросов к Axenix, rps",
+    lambda: {(): service.client.effective_rate()},
 )
+registry.callback(
+    "limiter_backlog_seconds", "Сколько секунд займет очередь ограничителя",
+    lambda: {(): service.client.limiter_backlog()},
+)
+registry.callback(
+    "cache_requests_total", "Обращения к кешам клиента Axenix",
+    cache_stats, labels=("cache", "result"), type="counter",
+)
+registry.callback(
+    "messages_shed_total", "Сообщения, отброшенные до обработки по сроку",
+    lambda: {(): deadlines.shed}, type="counter",
+)
+registry.callback(
+    "messages_deadline_missed_total", "Сообщения, обработанные позже срока",
+    lambda: {(): deadlines.missed}, type="counter",
+)
+registry.callback(
+    "consumer_concurrency_limit", "Текущий лимит одновременных сообщений",
+    lambda: {(): gate.limit},
+)
+registry.callback(
+    "outbox_backlog", "Заказы, ожидающие передачи во внутренний бэкенд",
+    lambda: {(): outbox.backlog},
+)
+metrics_server = None
+
+# global_qos: лимит на канал, его можно менять у работающего консьюмера
+broker = RabbitBroker(
+    url=settings.amqp_url,
+    default_channel=Channel(
+        prefetch_count=prefetch.prefetch_for(gate.limit), global_qos=True
+    ),
+)
+subscriber = broker.subscriber(queue=settings.RMQ_QUEUE)
+app = FastStream(broker)
+
+
+@app.on_startup
+async def start_background():
+    global metrics_server
+    outbox.start()
+    prefetch.start()
+    service.client.tokens.start()
+    if settings.METRICS_PORT is not None:
+        server = create_server(settings.METRICS_HOST, settings.METRICS_PORT)
+        metrics_server = (server, asyncio.create_task(server.serve()))
+
+
+@app.after_shutdown
+async def close_clients():
+    if metrics_server is not None:
+        server, task = metrics_server
+        server.should_exit = True
+        await task
+    await service.client.tokens.stop()
+    await prefetch.stop()
+    await outbox.stop()
+    await InternalClient.close()
+    tracer.close()
+
+
+@subscriber
 async def collect_new_bookings_tickets(
         body: Income
 ):
-    await service.client.check_token()
-    result = await service.processing_auto(body)
-    if not result:
-        if isinstance(result, bool):
-            logger.warning("Время брони вышло")
-            raise AckMessage()
-        logger.error("Ошибка брони")
+    started = time.monotonic()
+    outcome = "error"
+    with tracer.trace("consume", user_id=body.user_id) as span:
+        try:
+            outcome = await handle_income(body)
+        finally:
+            span.set("outcome", outcome)
+            message_seconds.observe(time.monotonic() - started, outcome)
+    if outcome in REQUEUE_OUTCOMES:
         raise NackMessage()
+    raise AckMessage()
+
+
+# исходы, при которых сообщение возвращается в очередь
+REQUEUE_OUTCOMES = ("nack", "circuit_open")
+
+
+async def handle_income(body: Income) -> str:
+    deadline = deadlines.deadline(body)
+    if deadlines.should_shed(deadline, message_flow(body)):
+        return shed_income(body)
+    await gate.acquire(deadline)
+    try:
+        return await process_income(body, deadline)
+    except RequestBudgetExceeded as err:
+        # повтор сообщения снова упрется в тот же бюджет
+        logger.error(f"Заказ пользователя {body.user_id} отклонен: {err}")
+        return "budget_exceeded"
+    except CircuitOpenError as err:
+        # Axenix недоступен: не занимаем его запросами, сообщение
+        # вернется в очередь после паузы
+        logger.warning(f"{err}, сообщение возвращается в очередь")
+        await asyncio.sleep(err.retry_after)
+        return "circuit_open"
+    finally:
+        gate.release()
+
+
+def message_flow(body: Income):
+    """Поток ограничителя, в котором пойдут запросы сообщения"""
+    return service.limiter_flow(body.user_id, [body.user_id])
+
+
+def shed_income(body: Income) -> str:
+    logger.warning(
+        f"Заказ пользователя {body.user_id} не успеет до {body.date_to}, "
+        f"отброшено сообщений: {deadlines.shed}"
+    )
+    return "shed"
+
+
+async def process_income(body: Income, deadline: float) -> str:
+    """
+    Возвращает:
+        str: исход обработки - booked, expired, nack или shed
+    """
+    # пока сообщение ждало слот, очередь ограничителя могла вырасти
+    if deadlines.should_shed(deadline, message_flow(body)):
+        return shed_income(body)
+    await service.client.check_token()
+    if settings.ROUTE_BATCH_WINDOW > 0:
+        result = await batcher.submit(body)
     else:
-        logger.info("Заказ успешно создан")
-        coroutines = [
-            InternalClient.save_new_order(res)
-            for res in result
-        ]
-        await asyncio.gather(*coroutines)
-        raise AckMessage()
+        result = await service.processing_auto(body)
+    deadlines.record(deadline)
+    if isinstance(result, bool) and not result:
+        logger.warning("Время брони вышло")
+        return "expired"
+    # None - бронь, отвергнутая Axenix (занято, 403 после повтора)
+    booked = [res for res in result or () if res is not None]
+    if not booked:
+        logger.error("Ошибка брони")
+        return "nack"
+    logger.info("Заказ успешно создан")
+    # доставку во внутренний бэкенд берет на себя outbox
+    with tracer.span("outbox_append"):
+        await outbox.append(booked)
+    return "booked"
 
 
 if __name__ == '__main__':
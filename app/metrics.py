@@ -0,0 +1,188 @@
+"""
+Метрики процесса в текстовом формате Prometheus.
+
+Счетчики и гистограммы - обычные словари в памяти процесса без
+блокировок: все обновления идут из одного event loop. Значения, которые
+уже считают сами компоненты (кеши, ограничитель), снимаются функциями
+в момент запроса /metrics
+"""
+import bisect
+import contextlib
+import math
+from typing import Callable
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300
+)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [
+        f'{name}="{str(value).replace(chr(34), chr(39))}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name + _format_labels(self.labels, labels), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+            self, name: str, documentation: str, labels: tuple = (),
+            buckets: tuple = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, value: float, *labels):
+        state = self._values.get(labels)
+        if state is None:
+            # счетчики по корзинам, сумма, количество
+            state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[0][index] += 1
+        state[1] += value
+        state[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket" + _format_labels(
+                    self.labels, labels, f'le="{bound}"'
+                ), cumulative
+            yield self.name + "_bucket" + _format_labels(
+                self.labels, labels, 'le="+Inf"'
+            ), count
+            yield self.name + "_sum" + _format_labels(self.labels, labels), total
+            yield self.name + "_count" + _format_labels(self.labels, labels), count
+
+
+class Callback:
+    """
+    Метрика, значения которой отдает функция: {значения меток: значение}
+    """
+
+    def __init__(
+            self, name: str, documentation: str, type: str,
+            fn: Callable[[], dict], labels: tuple = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.fn = fn
+        self.labels = labels
+
+    def samples(self):
+        for labels, value in self.fn().items():
+            yield self.name + _format_labels(self.labels, labels), value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(
+            self, name: str, documentation: str, labels: tuple = (),
+            buckets: tuple = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def callback(
+            self, name: str, documentation: str, fn: Callable[[], dict],
+            labels: tuple = (), type: str = "gauge",
+    ) -> Callback:
+        return self._register(Callback(name, documentation, type, fn, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for sample, value in metric.samples():
+                if math.isinf(value):
+                    value = "+Inf" if value > 0 else "-Inf"
+                lines.append(f"{sample} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+upstream_seconds = registry.histogram(
+    "axenix_request_seconds", "Длительность запросов к Axenix",
+    ("endpoint", "status"),
+)
+limiter_wait_seconds = registry.histogram(
+    "limiter_wait_seconds", "Ожидание токена ограничителя",
+    ("endpoint",),
+)
+retries_total = registry.counter(
+    "axenix_retries_total", "Повторы запросов к Axenix",
+    ("endpoint", "reason"),
+)
+message_seconds = registry.histogram(
+    "message_seconds", "Время обработки сообщения по исходу",
+    ("outcome",),
+)
+
+api = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+
+
+@api.get("/metrics", response_class=PlainTextResponse)
+async def scrape() -> str:
+    return registry.render()
+
+
+class MetricsServer(uvicorn.Server):
+    """uvicorn внутри чужого event loop: сигналы обрабатывает FastStream"""
+
+    @contextlib.contextmanager
+    def capture_signals(self):
+        yield
+
+    def install_signal_handlers(self):
+        # uvicorn до 0.29
+        pass
+
+
+def create_server(host: str, port: int) -> MetricsServer:
+    return MetricsServer(uvicorn.Config(
+        api, host=host, port=port, log_level="warning", access_log=False,
+    ))
@@ -1,6 +1,9 @@
+import datetime
 import enum
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr, model_validator
+
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
 
 class WagonType(enum.Enum):
     PLATZCART = "PLATZCART"
@@ -25,3 +28,21 @@ class Income(BaseModel):
     price: float | None = None
     seats_qty: int | None = None
     need_nearby: bool | None = None
+
+    _date_from: datetime.datetime = PrivateAttr(None)
+    _date_to: datetime.datetime = PrivateAttr(None)
+
+    @model_validator(mode="after")
+    def parse_dates(self):
+        # даты разбираются один раз при валидации сообщения
+        self._date_from = datetime.datetime.strptime(self.date_from, DATE_FORMAT)
+        self._date_to = datetime.datetime.strptime(self.date_to, DATE_FORMAT)
+        return self
+
+    @property
+    def date_from_dt(self) -> datetime.datetime:
+        return self._date_from
+
+    @property
+    def date_to_dt(self) -> datetime.datetime:
+        return self._date_to
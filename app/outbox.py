@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable
+
+from clients.response_models import BookingOrderResponseModel
+
+
+class Outbox:
+    """
+    Локальный журнал забронированных заказов перед передачей во внутренний
+    бэкенд.
+
+    Журнал разбит на сегменты с записями add/ack в формате JSON Lines.
+    fsync делается одной группой для всех записей, пришедших за
+    fsync_interval. Фоновая задача доставляет заказы с повторами и
+    экспоненциальной задержкой; при старте журнал перечитывается, заказы
+    склеиваются по order_id, поэтому повторная доставка одного заказа
+    из журнала невозможна
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+            self, directory: str,
+            sender: Callable[[BookingOrderResponseModel], Awaitable[bool]],
+            segment_size: int = 1024 * 1024, fsync_interval: float = 0.01,
+            batch_size: int = 50, retry_base: float = 1.0,
+            retry_max: float = 60.0,
+    ):
+        self.directory = directory
+        self.sender = sender
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self.pending = {}
+        self._attempts = {}
+        self._next_attempt = {}
+        self._segment_orders = {}
+        self._order_segment = {}
+
+        self._segment = None
+        self._fd = None
+        self._sync_waiters = []
+        self._sync_handle = None
+        # цикл событий держит на задачи только слабые ссылки
+        self._sync_tasks = set()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def backlog(self) -> int:
+        return len(self.pending)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}.log")
+
+    def _segments(self) -> list[int]:
+        return sorted(
+            int(name.split(".")[0])
+            for name in os.listdir(self.directory)
+            if name.endswith(".log")
+        )
+
+    def replay(self):
+        """Восстанавливает недоставленные заказы из журнала"""
+        os.makedirs(self.directory, exist_ok=True)
+        acked = set()
+        segments = self._segments()
+        for segment in segments:
+            self._segment_orders.setdefault(segment, set())
+            with open(self._segment_path(segment), "r", encoding="utf8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # недописанная строка после падения
+                        continue
+                    order_id = record["order_id"]
+                    if record["op"] == "add" and order_id not in acked:
+                        self.pending[order_id] = record["order"]
+                        self._track(segment, order_id)
+                    elif record["op"] == "ack":
+                        acked.add(order_id)
+                        self.pending.pop(order_id, None)
+                        self._untrack(order_id)
+
+        self._open_segment(segments[-1] + 1 if segments else 0)
+        if self.pending:
+            self.logger.warning(
+                f"В журнале {len(self.pending)} недоставленных заказов"
+            )
+            self._wakeup.set()
+
+    def _track(self, segment: int, order_id: int):
+        self._untrack(order_id)
+        self._segment_orders.setdefault(segment, set()).add(order_id)
+        self._order_segment[order_id] = segment
+
+    def _untrack(self, order_id: int):
+        segment = self._order_segment.pop(order_id, None)
+        if segment is not None:
+            self._segment_orders[segment].discard(order_id)
+
+    def _compact(self):
+        """
+        Удаляет старейшие сегменты, все заказы которых доставлены.
+        Удаление идет только с начала журнала, иначе вместе с сегментом
+        пропали бы ack-записи для заказов из более ранних сегментов
+        """
+        for segment in sorted(self._segment_orders):
+            if segment == self._segment or self._segment_orders[segment]:
+                break
+            del self._segment_orders[segment]
+            try:
+                os.remove(self._segment_path(segment))
+            except FileNotFoundError:
+                pass
+
+    def _open_segment(self, segment: int):
+        if self._fd is not None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+        self._segment = segment
+        self._segment_orders.setdefault(segment, set())
+        self._fd = os.open(
+            self._segment_path(segment),
+            os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+        )
+        self._compact()
+
+    def _write(self, record: dict):
+        os.write(self._fd, (json.dumps(record) + "\n").encode("utf8"))
+        if os.fstat(self._fd).st_size >= self.segment_size:
+            self._open_segment(self._segment + 1)
+
+    async def _sync(self):
+        """Ждет fsync, общий для всех записей текущего окна"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._sync_waiters.append(future)
+        if self._sync_handle is None:
+            self._sync_handle = loop.call_later(
+                self.fsync_interval, self._start_flush_sync, loop
+            )
+        await future
+
+    def _start_flush_sync(self, loop: asyncio.AbstractEventLoop):
+        task = loop.create_task(self._flush_sync())
+        self._sync_tasks.add(task)
+        task.add_done_callback(self._sync_tasks.discard)
+
+    async def _flush_sync(self):
+        waiters, self._sync_waiters = self._sync_waiters, []
+        self._sync_handle = None
+        try:
+            await asyncio.to_thread(os.fsync, self._fd)
+        except OSError as err:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(err)
+            return
+        for waiter in waiters:
+            # сообщение могли отменить, пока оно ждало fsync
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def append(self, orders: list[BookingOrderResponseModel]):
+        """Записывает заказы в журнал и возвращается после fsync"""
+        for order in orders:
+            data = order.model_dump()
+            # _write может открыть новый сегмент, запись осталась в текущем
+            segment = self._segment
+            self._write({"op": "add", "order_id": order.order_id, "order": data})
+            self.pending[order.order_id] = data
+            self._track(segment, order.order_id)
+        await self._sync()
+        self._wakeup.set()
+
+    def _ack(self, order_id: int):
+        self._write({"op": "ack", "order_id": order_id})
+        self.pending.pop(order_id, None)
+        self._attempts.pop(order_id, None)
+        self._next_attempt.pop(order_id, None)
+        self._untrack(order_id)
+        self._compact()
+
+    async def _deliver(self, order_id: int, data: dict):
+        try:
+            delivered = await self.sender(BookingOrderResponseModel(**data))
+        except Exception as err:
+            self.logger.exception(err)
+            delivered = False
+        if delivered:
+            self._ack(order_id)
+            return
+        attempts = self._attempts.get(order_id, 0) + 1
+        self._attempts[order_id] = attempts
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        self._next_attempt[order_id] = time.monotonic() + delay
+        self.logger.warning(
+            f"Заказ {order_id} не передан (попытка {attempts}), "
+            f"повтор через {delay}s"
+        )
+
+    async def run(self):
+        """Фоновая доставка заказов из журнала"""
+        while True:
+            now = time.monotonic()
+            due = [
+                (order_id, data)
+                for order_id, data in self.pending.items()
+                if self._next_attempt.get(order_id, 0) <= now
+            ][:self.batch_size]
+            if due:
+                await asyncio.gather(*[
+                    self._deliver(order_id, data) for order_id, data in due
+                ])
+                continue
+
+            self._wakeup.clear()
+            timeout = None
+            if self._next_attempt:
+                timeout = max(min(self._next_attempt.values()) - now, 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self.replay()
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await asyncio.gather(*self._sync_tasks, return_exceptions=True)
+        if self._fd is not None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
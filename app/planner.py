@@ -0,0 +1,71 @@
+import logging
+from array import array
+
+from clients.booking_plan import CandidateSeat, PlannedOrder
+
+MAX_SEATS_PER_ORDER = 10
+
+logger = logging.getLogger(__name__)
+
+
+def plan_orders(
+        user_id: int, candidates: list[CandidateSeat],
+        need: int | None = None, single_train: bool = True,
+) -> list[PlannedOrder]:
+    """
+    Упаковывает найденные места в минимальное число заказов.
+
+    Заказ - это один поезд, один вагон и не больше MAX_SEATS_PER_ORDER
+    мест, поэтому минимум достигается группировкой по (train_id, wagon_id)
+    и нарезкой каждой группы на полные чанки. Если мест больше, чем нужно,
+    сначала берутся самые наполненные вагоны: так групп меньше. Результат
+    не зависит от порядка ответов апстрима
+
+    Аргументы:
+        user_id (int): пользователь
+        candidates (list[CandidateSeat]): найденные места
+        need (int | None): сколько мест бронировать, None - все
+        single_train (bool): бронировать места только в одном поезде
+
+    Возвращает:
+        list[PlannedOrder]: заказы к отправке
+    """
+    groups = {}
+    for seat in candidates:
+        groups.setdefault((seat.train_id, seat.wagon_id), set()).add(seat.seat_id)
+
+    if single_train and groups:
+        per_train = {}
+        for (train_id, _), seat_ids in groups.items():
+            per_train[train_id] = per_train.get(train_id, 0) + len(seat_ids)
+        best_train = min(per_train, key=lambda train_id: (-per_train[train_id], train_id))
+        dropped = sum(
+            count for train_id, count in per_train.items()
+            if train_id != best_train
+        )
+        if dropped:
+            logger.info(
+                f"Для пользователя {user_id} выбран поезд {best_train}, "
+                f"отброшено {dropped} мест в других поездах"
+            )
+        groups = {
+            key: seat_ids for key, seat_ids in groups.items()
+            if key[0] == best_train
+        }
+
+    ordered = sorted(groups.items(), key=lambda item: (-len(item[1]), item[0]))
+    result = []
+    left = need
+    for (train_id, wagon_id), seat_ids in ordered:
+        seat_ids = sorted(seat_ids)
+        if left is not None:
+            if left <= 0:
+                break
+            seat_ids = seat_ids[:left]
+            left -= len(seat_ids)
+        for i in range(0, len(seat_ids), MAX_SEATS_PER_ORDER):
+            result.append(PlannedOrder(
+                user_id, train_id, wagon_id,
+                array("q", seat_ids[i:i + MAX_SEATS_PER_ORDER]),
+            ))
+    return result
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+from app.models import Income
+from clients.response_models import GetTrainsResponseModel
+
+
+class Ranker:
+    """
+    Упорядочивает поезда и вагоны до запроса схем мест: при лимите в 1 rps
+    порядок запросов определяет время до первой брони.
+
+    Для вагонов учитывается доля прошлых запросов, в которых нашлись
+    подходящие места (со сглаживанием Лапласа). История хранится для
+    max_size последних вагонов, давно не встречавшиеся вытесняются: поезда
+    уходят, и их вагоны больше не запрашиваются
+    """
+
+    def __init__(
+            self, prior_hits: float = 1.0, prior_total: float = 2.0,
+            max_size: int = 8192,
+    ):
+        self.prior_hits = prior_hits
+        self.prior_total = prior_total
+        self.max_size = max_size
+        self._history = OrderedDict()
+
+    def record(self, train_id: int, wagon_id: int, hit: bool):
+        key = (train_id, wagon_id)
+        hits, total = self._history.get(key, (0, 0))
+        self._history[key] = (hits + int(hit), total + 1)
+        self._history.move_to_end(key)
+        while len(self._history) > self.max_size:
+            self._history.popitem(last=False)
+
+    def hit_rate(self, train_id: int, wagon_id: int) -> float:
+        hits, total = self._history.get((train_id, wagon_id), (0, 0))
+        return (hits + self.prior_hits) / (total + self.prior_total)
+
+    def rank_trains(
+            self, trains: list[GetTrainsResponseModel], order_data: Income,
+            need: int = 1,
+    ) -> list[GetTrainsResponseModel]:
+        """
+        Сначала поезда, где мест хватает на весь заказ, затем по времени
+        отправления, затем по числу свободных мест
+        """
+        def key(train: GetTrainsResponseModel):
+            return (
+                train.available_seats_count < need,
+                train.departure,
+                -train.available_seats_count,
+            )
+
+        return sorted(trains, key=key)
+
+    def rank_wagons(
+            self, train_id: int, wagons: list[dict], order_data: Income,
+    ) -> list[dict]:
+        """Подходящие по типу вагоны с лучшей историей попаданий - первыми"""
+        def key(item):
+            index, wagon = item
+            type_mismatch = (
+                order_data.wagon_type is not None
+                and wagon["type"] != order_data.wagon_type.value
+            )
+            return (
+                type_mismatch,
+                -self.hit_rate(train_id, wagon["wagon_id"]),
+                index,
+            )
+
+        return [wagon for _, wagon in sorted(enumerate(wagons), key=key)]
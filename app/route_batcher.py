@@ -0,0 +1,66 @@
+import asyncio
+import logging
+
+from app.models import Income
+from app.service import BookingService
+
+
+class RouteBatcher:
+    """
+    Копит сообщения с одинаковым route в течение window секунд и
+    обрабатывает их одним поиском BookingService.processing_batch.
+    Сообщения с заданными train_id/wagon_id/seat_id идут напрямую
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, service: BookingService, window: float):
+        self.service = service
+        self.window = window
+        self._pending = {}
+        # цикл событий держит на задачи только слабые ссылки
+        self._flush_tasks = set()
+
+    async def submit(self, order_data: Income):
+        if order_data.train_id is not None:
+            return await self.service.processing_auto(order_data)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(order_data.route)
+        if batch is None:
+            batch = self._pending[order_data.route] = []
+            loop.call_later(
+                self.window, self._start_flush, loop, order_data.route
+            )
+        batch.append((order_data, future))
+        return await future
+
+    def _start_flush(self, loop: asyncio.AbstractEventLoop, route: str):
+        task = loop.create_task(self._flush(route))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, route: str):
+        batch = self._pending.pop(route, [])
+        batch = [(order, future) for order, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            if len(batch) == 1:
+                results = [await self.service.processing_auto(batch[0][0])]
+            else:
+                self.logger.info(
+                    f"Общий поиск для {len(batch)} заказов по маршруту {route}"
+                )
+                results = await self.service.processing_batch(
+                    [order for order, _ in batch]
+                )
+        except Exception as err:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
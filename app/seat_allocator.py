@@ -0,0 +1,79 @@
+from collections import deque
+from typing import Callable, NamedTuple
+
+from clients.response_models import SeatRecord
+
+
+class SeatRun(NamedTuple):
+    """Группа подряд идущих свободных мест одного блока"""
+    price: int
+    block: str
+    start: int
+    seats: list
+
+
+def find_runs(
+        seats: list[SeatRecord], qty: int,
+        is_suitable: Callable[[SeatRecord], bool],
+) -> list[SeatRun]:
+    """
+    Находит все группы из qty подряд идущих подходящих мест одного блока
+    за один проход по отсортированной схеме вагона
+
+    Аргументы:
+        seats (list[SeatRecord]): схема мест вагона
+        qty (int): размер группы
+        is_suitable (Callable): подходит ли место под заказ
+
+    Возвращает:
+        list[SeatRun]: группы, от лучшей к худшей
+    """
+    ordered = sorted(seats, key=lambda seat: (seat.block, int(seat.seat_num)))
+    runs = []
+    window = deque()
+    window_price = 0
+    for seat in ordered:
+        num = int(seat.seat_num)
+        if not is_suitable(seat):
+            window.clear()
+            window_price = 0
+            continue
+        if window and (
+                window[-1].block != seat.block
+                or int(window[-1].seat_num) + 1 != num
+        ):
+            window.clear()
+            window_price = 0
+        window.append(seat)
+        window_price += seat.price
+        if len(window) > qty:
+            window_price -= window.popleft().price
+        if len(window) == qty:
+            runs.append(SeatRun(
+                window_price, seat.block,
+                int(window[0].seat_num), list(window)
+            ))
+    runs.sort(key=lambda run: (run.price, run.block, run.start))
+    return runs
+
+
+def best_run(
+        seats: list[SeatRecord], qty: int,
+        is_suitable: Callable[[SeatRecord], bool],
+) -> SeatRun | None:
+    runs = find_runs(seats, qty, is_suitable)
+    return runs[0] if runs else None
+
+
+def rank_runs(runs_by_wagon: dict[int, list[SeatRun]]) -> list[tuple[int, SeatRun]]:
+    """
+    Упорядочивает группы нескольких вагонов: дешевле - раньше. Следующие
+    группы - запасные, если лучшую успело занять другое сообщение
+    """
+    ranked = [
+        (wagon_id, run)
+        for wagon_id, runs in runs_by_wagon.items()
+        for run in runs
+    ]
+    ranked.sort(key=lambda item: (item[1].price, item[0], item[1].start))
+    return ranked
@@ -1,93 +1,224 @@
 import asyncio
 import datetime
 import logging
+from contextlib import aclosing
 
 from watchfiles import awatch
 
+from app.ledger import SeatLedger
 from app.models import Income, WagonType, PlacePosition
+from app.planner import plan_orders
+from app.ranking import Ranker
+from app.seat_allocator import SeatRun, best_run, find_runs, rank_runs
+from app.settings import settings
+from app.tracing import traced
 from clients.axenix import AxenixClient
-from clients.response_models import GetTrainsResponseModel, BookingOrderRequestModel, GetSeatsResponseModel, \
-    BookingOrderRequestModelV2
+from clients.booking_plan import CandidateSeat
+from clients.rate_limiter import LimiterFlow, current_flow
+from clients.response_models import GetTrainsResponseModel, SeatRecord
 
 
 class BookingService:
-    def __init__(self, api_client: AxenixClient):
+    def __init__(
+            self, api_client: AxenixClient, ranker: Ranker | None = None,
+            ledger: SeatLedger | None = None,
+    ):
         self.client = api_client
+        self.ranker = ranker or Ranker(max_size=settings.RANKER_HISTORY_SIZE)
+        self.ledger = ledger or SeatLedger(
+            settings.LEDGER_CLAIM_TTL, settings.LEDGER_CONFIRMED_TTL
+        )
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    async def wagons_processing(self, user_id: int, train_id: int, wagon_id: int, order_data: Income):
-        seats = await self.client.get_wagon_info(train_id=train_id, wagon_id=wagon_id)
-        _booking_params = []
-        for seat in seats["seats"]:
-            seat_id = self.seat_processing(seat, order_data)
-            if seat_id is not None:
-                _booking_params.extend([{
-                    "user_id": user_id,
-                    "params": BookingOrderRequestModel(
-                        train_id=train_id,
-                        wagon_id=wagon_id,
-                        seat_ids=seat_id,
-                    )
-                }])
-                if order_data.seats_qty is not None and order_data.seats_qty > 0:
-                    if len(_booking_params) >= order_data.seats_qty:
-                        break
-                    else:
-                        continue
-                else:
-                    break
+    def select_seats(
+            self, seats: list[SeatRecord], order_data: Income,
+            exclude=frozenset(), need: int | None = None,
+    ) -> list[SeatRecord]:
+        """
+        Выбирает места под заказ из схемы вагона
+
+        Аргументы:
+            seats (list[SeatRecord]): схема мест вагона
+            order_data (Income): заказ
+            exclude (set[int]): места, уже отданные другим заказам
+            need (int | None): сколько мест нужно, по умолчанию seats_qty
+
+        Возвращает:
+            list[SeatRecord]: выбранные места, пустой список - ничего не нашлось
+        """
+        if need is None:
+            need = self.seats_needed(order_data)
+        is_suitable = self.suitable(order_data, exclude)
 
         if order_data.need_nearby:
-            seats_ids_list = [
-                param["params"].seat_ids
-                for param in _booking_params
-            ]
+            run = best_run(seats, need, is_suitable)
+            return run.seats if run is not None else []
+
+        chosen = []
+        for seat in seats:
+            if is_suitable(seat):
+                chosen.append(seat)
+                if len(chosen) >= need:
+                    break
+        return chosen
 
-            seats_nums = {
-                seat.seat_num: seat.block
-                for seat in seats["seats"]
-                    if seat.seat_id in seats_ids_list
-            }
+    def suitable(self, order_data: Income, exclude=frozenset()):
+        def is_suitable(seat: SeatRecord):
+            return (
+                seat.seat_id not in exclude
+                and self.seat_processing(seat, order_data) is not None
+            )
+        return is_suitable
 
-            _nums = list(seats_nums.keys())
-            _nums.sort(key=lambda x: x)
-            _block = seats_nums.values()
+    @staticmethod
+    def candidate_seats(train_id: int, wagon_id: int, seats: list[SeatRecord]):
+        return [
+            CandidateSeat(train_id, wagon_id, seat.seat_id)
+            for seat in seats
+        ]
 
-            set_block = set(_block)
-            if len(set_block) > 1:
-                return None
+    @traced()
+    async def wagons_processing(self, user_id: int, train_id: int, wagon_id: int, order_data: Income):
+        seats = await self.client.get_wagon_info(train_id=train_id, wagon_id=wagon_id)
+        if not seats:
+            return None
 
-            for i in range(1, len(_nums)):
-                if abs(int(_nums[i- 1]) - int(_nums[i])) != 1:
-                    return None
+        chosen = self.select_seats(
+            seats["seats"], order_data,
+            exclude=self.ledger.claimed(train_id, wagon_id, order_data),
+        )
+        self.ranker.record(train_id, wagon_id, len(chosen) > 0)
+        self.ledger.claim(
+            train_id, wagon_id, [seat.seat_id for seat in chosen], order_data
+        )
+        if order_data.need_nearby and not chosen:
+            return None
+        return self.candidate_seats(train_id, wagon_id, chosen)
+
+    @traced()
+    async def wagon_run(
+            self, user_id: int, train_id: int, wagon_id: int, order_data: Income
+    ) -> tuple[int, list[SeatRun]] | None:
+        """Группы подряд идущих мест вагона от лучшей, без резерва в ledger"""
+        seats = await self.client.get_wagon_info(train_id=train_id, wagon_id=wagon_id)
+        if not seats:
+            return None
+        runs = find_runs(
+            seats["seats"], self.seats_needed(order_data),
+            self.suitable(
+                order_data, self.ledger.claimed(train_id, wagon_id, order_data)
+            ),
+        )
+        self.ranker.record(train_id, wagon_id, bool(runs))
+        if not runs:
+            return None
+        return wagon_id, runs
 
-        return _booking_params
+    async def scan_wagons(
+            self, user_id: int, train_id: int, wagon_ids: list[int],
+            order_data: Income, process=None,
+    ):
+        """
+        Запрашивает вагоны параллельно и отдает подходящие места по мере
+        получения ответов. При закрытии генератора незавершенные запросы
+        отменяются, в том числе стоящие в очереди ограничителя
+
+        Аргументы:
+            process: обработка одного вагона, по умолчанию wagons_processing
+        """
+        process = process or self.wagons_processing
+        tasks = [
+            asyncio.create_task(
+                process(user_id, train_id, wagon_id, order_data)
+            )
+            for wagon_id in wagon_ids
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                res = await next_done
+                if res:
+                    yield res
+        finally:
+            for task in tasks:
+                task.cancel()
+            # дожидаемся отмены, чтобы ошибки задач не терялись без await
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def seats_needed(order_data: Income) -> int:
+        if order_data.seats_qty is not None and order_data.seats_qty > 0:
+            return order_data.seats_qty
+        return 1
 
+    @traced()
     async def train_processing(self, user_id: int, train_id: int, order_data: Income):
         train = await self.client.get_train_by_id(train_id=train_id)
         if train.available_seats_count == 0:
             return []
 
-        train_wagons = train.wagons_info
-        coroutines = []
-        for wagon in train_wagons:
+        wagon_ids = []
+        for wagon in self.ranker.rank_wagons(train_id, train.wagons_info, order_data):
             wagon_type = wagon["type"]
             if order_data.wagon_type is not None:
                 if wagon_type != order_data.wagon_type.value:
                     continue
+            wagon_ids.append(wagon["wagon_id"])
 
-            coroutines.append(
-                self.wagons_processing(user_id, train_id, wagon["wagon_id"], order_data)
+        if order_data.need_nearby:
+            return await self.nearby_processing(
+                user_id, train_id, wagon_ids, order_data
             )
 
-        result = await asyncio.gather(*coroutines)
+        # в ленивом режиме сканирование останавливается, как только
+        # набрано seats_qty мест
+        need = self.seats_needed(order_data) if settings.WAGON_SCAN_LAZY else None
+        found = 0
         to_handle = []
-        for res in result:
-            if res is not None:
-                # yield res
+        async with aclosing(
+                self.scan_wagons(user_id, train_id, wagon_ids, order_data)
+        ) as scan:
+            async for res in scan:
+                if need is not None:
+                    res = res[:need - found]
                 to_handle.append(res)
+                found += len(res)
+                if need is not None and found >= need:
+                    break
         return to_handle
-        # return []
+
+    async def nearby_processing(
+            self, user_id: int, train_id: int, wagon_ids: list[int],
+            order_data: Income
+    ):
+        """
+        Места need_nearby берутся одной группой в одном вагоне. В ленивом
+        режиме - первая найденная группа, иначе самая дешевая среди всех
+        вагонов поезда (rank_runs). В ledger резервируется только она.
+        Пока шел обход, другое сообщение могло заявить часть мест, поэтому
+        заявки проверяются заново и занятая группа уступает следующей
+
+        Возвращает:
+            list[list[CandidateSeat]]: места группы или пустой список
+        """
+        runs = {}
+        async with aclosing(self.scan_wagons(
+                user_id, train_id, wagon_ids, order_data, self.wagon_run
+        )) as scan:
+            async for wagon_id, wagon_runs in scan:
+                runs[wagon_id] = wagon_runs
+                if settings.WAGON_SCAN_LAZY:
+                    break
+        claimed = {}
+        for wagon_id, run in rank_runs(runs):
+            if wagon_id not in claimed:
+                claimed[wagon_id] = self.ledger.claimed(
+                    train_id, wagon_id, order_data
+                )
+            seat_ids = [seat.seat_id for seat in run.seats]
+            if claimed[wagon_id].isdisjoint(seat_ids):
+                self.ledger.claim(train_id, wagon_id, seat_ids, order_data)
+                return [self.candidate_seats(train_id, wagon_id, run.seats)]
+        return []
 
     async def need_booking_data_exist(
             self, order_data: Income
@@ -99,17 +230,12 @@ class BookingService:
 
         booking_params = None
         if train_id is not None and wagon_id is not None and seat_id is not None:
-            booking_params = [{
-                "user_id": user_id,
-                "params": BookingOrderRequestModel(
-                    train_id=train_id,
-                    wagon_id=wagon_id,
-                    seat_id=seat_id,
-                ),
-            }]
+            booking_params = [[CandidateSeat(train_id, wagon_id, seat_id)]]
 
         if train_id is not None and wagon_id is not None and seat_id is None:
-            booking_params = await self.wagons_processing(user_id, train_id, wagon_id, order_data)
+            wagon_params = await self.wagons_processing(user_id, train_id, wagon_id, order_data)
+            if wagon_params:
+                booking_params = [wagon_params]
 
         if train_id is not None and wagon_id is None and seat_id is None:
             booking_params = await self.train_processing(user_id, train_id, order_data)
@@ -118,20 +244,39 @@ class BookingService:
         if booking_params is None or len(booking_params) == 0:
             return None
 
-        to_final_params = self.merge_dicts([
-            params["params"]
-            for params in booking_params
-        ])
-
-        booking_params = [{
-            "user_id": user_id,
-            "params": BookingOrderRequestModelV2.model_validate(to_final_params),
-        }]
-        booking_params = self.split_seats(booking_params)
-        result = await self.client.booking(booking_params)
-        return result
+        return await self.book_wagon_params(order_data, booking_params)
 
+    @staticmethod
+    def limiter_flow(key, user_ids: list[int]) -> LimiterFlow:
+        """
+        Поток ограничителя для сообщения или пачки сообщений: вес и бюджет
+        запросов складываются по пользователям
+        """
+        budget = settings.LIMITER_MESSAGE_BUDGET
+        return LimiterFlow(
+            key,
+            weight=sum(
+                settings.LIMITER_USER_WEIGHTS.get(user_id, 1.0)
+                for user_id in user_ids
+            ),
+            budget=budget * len(user_ids) if budget is not None else None,
+        )
+
+    @traced()
     async def processing_auto(self, order_data: Income):
+        token = current_flow.set(
+            self.limiter_flow(order_data.user_id, [order_data.user_id])
+        )
+        try:
+            return await self._processing_auto(order_data)
+        finally:
+            current_flow.reset(token)
+            # места, которые не ушли в успешную бронь, снова доступны
+            self.ledger.release_owner(order_data)
+
+    async def _processing_auto(self, order_data: Income):
+        if order_data.date_to_dt <= datetime.datetime.now():
+            return False
 
         booking_result = await self.need_booking_data_exist(
             order_data
@@ -140,44 +285,37 @@ class BookingService:
             return booking_result
 
         start_point, *_, end_point = order_data.route.split(" -> ")
-        orders_for_route = await self.client.get_trains(
+        trains_index = await self.client.get_trains_index(
             start_point, end_point
         )
         self.logger.info(
-            f"Всего найдено {len(orders_for_route)} "
+            f"Всего найдено {len(trains_index)} "
             f"поездов по маршруту: {start_point} -> {end_point}"
         )
 
-        suitable_date_range_trains = []
-        for train in orders_for_route:
-            date_from = datetime.datetime.strptime(
-                order_data.date_from, "%d.%m.%Y %H:%M:%S"
-            )
-            date_to = datetime.datetime.strptime(
-                order_data.date_to, "%d.%m.%Y %H:%M:%S"
-            )
-            # if date_to <= datetime.datetime.now():
-            #     return False
-            if date_from <= datetime.datetime.strptime(
-                    train.startpoint_departure,
-                    "%d.%m.%Y %H:%M:%S"
-            ) <= date_to:
-                suitable_date_range_trains.append(train)
+        suitable_date_range_trains = trains_index.window(
+            order_data.date_from_dt, order_data.date_to_dt, with_seats=False
+        )
         self.logger.info(
             f"Всего найдено: {len(suitable_date_range_trains)} "
             f"поездов подходящих по датам"
         )
 
-        suitable_available_seats_count_trains = []
-        for train in suitable_date_range_trains:
-            if train.available_seats_count != 0:
-                suitable_available_seats_count_trains.append(train)
-
+        suitable_available_seats_count_trains = trains_index.window(
+            order_data.date_from_dt, order_data.date_to_dt
+        )
         self.logger.info(
             f"Всего найдено: {len(suitable_available_seats_count_trains)} "
             f"со свободными местами"
         )
+        suitable_available_seats_count_trains = self.ranker.rank_trains(
+            suitable_available_seats_count_trains, order_data,
+            need=self.seats_needed(order_data),
+        )
 
+        # бронируется один поезд (plan_orders), поэтому ленивый обход
+        # останавливается, только когда мест хватает в одном поезде
+        need = self.seats_needed(order_data) if settings.WAGON_SCAN_LAZY else None
         final_booking_params = []
         for train in suitable_available_seats_count_trains:
             # booking_params = await self.train_processing(
@@ -193,22 +331,173 @@ class BookingService:
             #     "user_id": order_data.user_id,
             #     "params": BookingOrderRequestModelV2.model_validate(to_final_params),
             # })
+             found = 0
              for booking_params in await self.train_processing(order_data.user_id, train.train_id, order_data):
                 if booking_params is None or len(booking_params) == 0:
                     return None
-                to_final_params = self.merge_dicts([
-                    params["params"]
-                    for params in booking_params
-                ])
-                final_booking_params.append({
-                    "user_id": order_data.user_id,
-                    "params": BookingOrderRequestModelV2.model_validate(to_final_params),
-                })
-
-        final_booking_params = self.merge_seats_by_train_and_wagon(final_booking_params)
-        final_booking_params = self.group_common_train(final_booking_params)
-        final_booking_params = self.split_and_merge_seats(final_booking_params)
+                final_booking_params.append(booking_params)
+                found += len(booking_params)
+             if need is not None and found >= need:
+                 break
+
+        return await self.book_wagon_params(order_data, final_booking_params)
+
+    async def book_wagon_params(self, order_data: Income, wagon_params: list[list[CandidateSeat]]):
+        """Собирает найденные по вагонам места в заказы и бронирует их"""
+        candidates = [
+            seat
+            for booking_params in wagon_params
+            for seat in booking_params
+        ]
+        # WAGON_SCAN_LAZY влияет только на обход вагонов: бронируется
+        # всегда столько мест, сколько просили
+        final_booking_params = plan_orders(
+            order_data.user_id, candidates, need=self.seats_needed(order_data)
+        )
         result = await self.client.booking(final_booking_params)
+        for res in result:
+            if res is not None:
+                self.ledger.confirm(
+                    res.train_id, res.wagon_id, res.seat_ids, order_data
+                )
+        return result
+
+    @traced()
+    async def processing_batch(self, orders: list[Income]):
+        token = current_flow.set(self.limiter_flow(
+            orders[0].route, [order.user_id for order in orders]
+        ))
+        try:
+            return await self._processing_batch(orders)
+        finally:
+            current_flow.reset(token)
+            for order in orders:
+                self.ledger.release_owner(order)
+
+    async def _processing_batch(self, orders: list[Income]):
+        """
+        Один поиск по маршруту для нескольких сообщений: поезда и схемы
+        мест запрашиваются один раз на всю пачку в объединенном окне дат,
+        места раздаются пользователям без пересечений
+
+        Возвращает:
+            list: результаты брони в порядке orders
+        """
+        start_point, *_, end_point = orders[0].route.split(" -> ")
+        trains_index = await self.client.get_trains_index(
+            start_point, end_point
+        )
+        date_from = min(order.date_from_dt for order in orders)
+        date_to = max(order.date_to_dt for order in orders)
+        trains = self.ranker.rank_trains(
+            trains_index.window(date_from, date_to), orders[0],
+            need=max(self.seats_needed(order) for order in orders),
+        )
+        self.logger.info(
+            f"Пачка из {len(orders)} заказов по маршруту "
+            f"{start_point} -> {end_point}: {len(trains)} поездов"
+        )
+
+        # заказ бронируется в одном поезде (plan_orders), поэтому места
+        # пользователю отдаются только из поезда, где хватает на весь
+        # заказ; частичный набор не занимает места и остается запасным
+        remaining = [self.seats_needed(order) for order in orders]
+        found = [[] for _ in orders]
+        partial = [[] for _ in orders]
+        taken = set()
+        for train in trains:
+            interested = [
+                i for i, order in enumerate(orders)
+                if remaining[i] > 0
+                and order.date_from_dt <= train.departure <= order.date_to_dt
+            ]
+            if not interested:
+                continue
+
+            train_info = await self.client.get_train_by_id(train_id=train.train_id)
+            if not train_info or train_info.available_seats_count == 0:
+                continue
+            wagons = self.ranker.rank_wagons(
+                train.train_id, train_info.wagons_info, orders[interested[0]]
+            )
+            picked = {i: [] for i in interested}
+            got = dict.fromkeys(interested, 0)
+            train_taken = set()
+            for wagon in wagons:
+                wanting = [
+                    i for i in interested
+                    if got[i] < remaining[i] and (
+                        orders[i].wagon_type is None
+                        or wagon["type"] == orders[i].wagon_type.value
+                    )
+                ]
+                if not wanting:
+                    continue
+                seats = await self.client.get_wagon_info(
+                    train_id=train.train_id, wagon_id=wagon["wagon_id"]
+                )
+                if not seats:
+                    continue
+
+                hit = False
+                for i in wanting:
+                    chosen = self.select_seats(
+                        seats["seats"], orders[i],
+                        exclude=taken | train_taken | self.ledger.claimed(
+                            train.train_id, wagon["wagon_id"], orders[i]
+                        ),
+                        need=remaining[i] - got[i],
+                    )
+                    if not chosen:
+                        continue
+                    hit = True
+                    train_taken.update(seat.seat_id for seat in chosen)
+                    got[i] += len(chosen)
+                    picked[i].append((wagon["wagon_id"], chosen))
+                self.ranker.record(train.train_id, wagon["wagon_id"], hit)
+
+            for i, wagon_seats in picked.items():
+                if got[i] >= remaining[i]:
+                    found[i] = self.take_seats(
+                        orders[i], train.train_id, wagon_seats, taken
+                    )
+                    remaining[i] = 0
+                elif got[i] > sum(len(seats) for _, _, seats in partial[i]):
+                    partial[i] = [
+                        (train.train_id, wagon_id, seats)
+                        for wagon_id, seats in wagon_seats
+                    ]
+
+        for i, wagon_seats in enumerate(partial):
+            if remaining[i] == 0 or not wagon_seats:
+                continue
+            # ни один поезд не вместил заказ: лучший частичный набор из
+            # оставшихся мест, как при обработке без пачки
+            train_id = wagon_seats[0][0]
+            found[i] = self.take_seats(orders[i], train_id, [
+                (wagon_id, [seat for seat in seats if seat.seat_id not in taken])
+                for _, wagon_id, seats in wagon_seats
+            ], taken)
+
+        return list(await asyncio.gather(*[
+            self.book_wagon_params(order, wagon_params)
+            for order, wagon_params in zip(orders, found)
+        ]))
+
+    def take_seats(
+            self, order_data: Income, train_id: int,
+            wagon_seats: list[tuple[int, list[SeatRecord]]], taken: set,
+    ) -> list[list[CandidateSeat]]:
+        """Заявляет выбранные места поезда за заказом пачки"""
+        result = []
+        for wagon_id, seats in wagon_seats:
+            if not seats:
+                continue
+            self.ledger.claim(
+                train_id, wagon_id, [seat.seat_id for seat in seats], order_data
+            )
+            taken.update(seat.seat_id for seat in seats)
+            result.append(self.candidate_seats(train_id, wagon_id, seats))
         return result
 
     @staticmethod
@@ -218,7 +507,7 @@ class BookingService:
         else:
             return PlacePosition.DOWN.value
 
-    def seat_processing(self, seat: GetSeatsResponseModel, order_data: Income):
+    def seat_processing(self, seat: SeatRecord, order_data: Income):
         seat_id = None
 
         if seat.booking_status == "FREE":
@@ -261,145 +550,3 @@ class BookingService:
                         "wagon_id": wagon["wagon_id"]
                     })
         return result
-
-    @staticmethod
-    def merge_dicts(dicts):
-        merged_dict = {}
-        for d in dicts:
-            for key, value in d.model_dump().items():
-                if key in merged_dict and not isinstance(merged_dict[key], list) and merged_dict[key] != value:
-                    merged_dict[key] = [merged_dict[key], value]
-                elif key in merged_dict and isinstance(merged_dict[key], list):
-                    if value not in merged_dict[key]:
-                        merged_dict[key].append(value)
-                else:
-                    merged_dict[key] = value
-        return merged_dict
-
-    @staticmethod
-    def split_seats(final_booking_params: list):
-        result = []
-        max_seats = 10
-
-        for order in final_booking_params:
-            user_id = order['user_id']
-            params = order['params']
-
-            seat_ids = params.seat_ids
-
-            for i in range(0, len(seat_ids), max_seats):
-                chunk = seat_ids[i:i + max_seats]
-                new_params = BookingOrderRequestModelV2(train_id=params.train_id, wagon_id=params.wagon_id,
-                                                        seat_ids=chunk)
-                result.append({'user_id': user_id, 'params': new_params})
-
-        return result
-
-    @staticmethod
-    def split_and_merge_seats(orders):
-        result = []
-        max_seats = 10
-        merged_orders = {}
-
-        for order in orders:
-            user_id = order['user_id']
-            params = order['params']
-            seat_ids = params.seat_ids
-
-            # Проверка на необходимость объединения
-            if params.train_id in merged_orders and len(seat_ids) <= 2:
-                existing_order = merged_orders[params.train_id]
-                if len(existing_order['params'].seat_ids) <= 2:
-                    # Объединяем места из обоих заказов
-                    combined_seat_ids = existing_order['params'].seat_ids + seat_ids
-                    if len(combined_seat_ids) <= max_seats:
-                        existing_order['params'].seat_ids = combined_seat_ids
-                        continue
-
-            # Если объединение не произошло, разбиваем на чанки по max_seats
-            for i in range(0, len(seat_ids), max_seats):
-                chunk = seat_ids[i:i + max_seats]
-                new_params = BookingOrderRequestModelV2(train_id=params.train_id, wagon_id=params.wagon_id,
-                                                        seat_ids=chunk)
-                new_order = {'user_id': user_id, 'params': new_params}
-
-                # Добавляем новый заказ в результаты и словарь для объединения
-                result.append(new_order)
-                merged_orders[params.train_id] = new_order
-
-        return result
-
-    @staticmethod
-    def merge_seats_with_same_train_id(orders):
-        result = []
-        seat_limit = 10
-        merged_orders = {}
-
-        # Обрабатываем каждый заказ
-        for order in orders:
-            user_id = order['user_id']
-            params = order['params']
-            train_id = params.train_id
-            seat_ids = params.seat_ids
-
-            if train_id in merged_orders and len(seat_ids) <= seat_limit:
-                existing_order = merged_orders[train_id]
-                if len(existing_order['params'].seat_ids) <= seat_limit:
-                    combined_seat_ids = existing_order['params'].seat_ids + seat_ids
-                    if len(combined_seat_ids) <= 10:
-                        existing_order['params'].seat_ids = combined_seat_ids
-                    else:
-                        continue
-            else:
-                if len(seat_ids) <= seat_limit:
-                    merged_orders[train_id] = {
-                        'user_id': user_id,
-                        'params': BookingOrderRequestModelV2(train_id=params.train_id, wagon_id=params.wagon_id,
-                                                             seat_ids=seat_ids)
-                    }
-
-        result = list(merged_orders.values())
-
-        return result
-
-    @staticmethod
-    def merge_seats_by_train_and_wagon(orders):
-        merged_orders = {}
-
-        for order in orders:
-            user_id = order['user_id']
-            params = order['params']
-            train_id = params.train_id
-            wagon_id = params.wagon_id
-            seat_ids = params.seat_ids
-
-            # Создаем уникальный ключ для комбинации train_id и wagon_id
-            key = (train_id, wagon_id)
-
-            # Если ключ уже существует, объединяем seat_ids
-            if key in merged_orders:
-                merged_orders[key]['params'].seat_ids.extend(seat_ids)
-            else:
-                # Добавляем новый заказ в словарь для будущего объединения
-                merged_orders[key] = {
-                    'user_id': user_id,
-                    'params': BookingOrderRequestModelV2(train_id=train_id, wagon_id=wagon_id, seat_ids=seat_ids)
-                }
-
-        # Возвращаем список объединённых заказов
-        return list(merged_orders.values())
-
-    @staticmethod
-    def group_common_train(orders):
-        result = []
-        train_id = None
-
-        for order in orders:
-            if train_id is None:
-                train_id = order["params"].train_id
-            if order["params"].train_id == train_id:
-                result.append(order)
-            else:
-                continue
-
-        return result
@@ -10,12 +10,90 @@ class Settings(BaseSettings):
     RMQ_PASSWORD: str
 
     RMQ_QUEUE: str
+    # верхняя граница prefetch; фактический prefetch идет за лимитом
+    # одновременных сообщений плюс RMQ_PREFETCH_EXTRA
+    RMQ_PREFETCH: int = 10
+    RMQ_PREFETCH_EXTRA: int = 2
+
+    CONSUMER_MAX_CONCURRENCY: int = 10
+    CONSUMER_MIN_CONCURRENCY: int = 1
+    # сколько секунд очереди ограничителя допускается перед тем,
+    # как брать в работу новые сообщения
+    CONSUMER_TARGET_BACKLOG: float = 30.0
+    # минимум запросов к Axenix на сообщение для оценки, успеет ли оно до date_to
+    DEADLINE_MIN_CALLS: int = 3
 
     AXENIX_LOGIN: str
     AXENIX_PASSWORD: str
 
     BACK_X_KEY: str
 
+    # за сколько секунд до истечения токена Axenix обновлять его в фоне
+    AUTH_REFRESH_AHEAD: float = 1.0
+
+    # memory | file | coordinator
+    LIMITER_BACKEND: str = "memory"
+    LIMITER_FILE: str = "/tmp/axenix-limiter.json"
+    LIMITER_COORDINATOR_URL: str | None = None
+    LIMITER_REPLICAS: int = 1
+    # подбор скорости запросов к Axenix по ответам (AIMD)
+    LIMITER_ADAPTIVE: bool = False
+    LIMITER_RATE_FLOOR: float = 0.5
+    LIMITER_RATE_CEILING: float = 5.0
+    # вес пользователя в справедливой очереди ограничителя, по умолчанию 1
+    LIMITER_USER_WEIGHTS: dict[int, float] = {}
+    # сколько запросов к апстриму может сделать одно сообщение, None - без лимита
+    LIMITER_MESSAGE_BUDGET: int | None = None
+
+    RETRY_BASE_DELAY: float = 0.5
+    RETRY_MAX_DELAY: float = 30.0
+    # доля лимита Axenix, которую могут занять повторы
+    RETRY_BUDGET_RATIO: float = 0.2
+    BREAKER_THRESHOLD: int = 5
+    BREAKER_RESET: float = 30.0
+
+    TRAINS_CACHE_TTL: float = 5.0
+    TRAINS_CACHE_SIZE: int = 256
+    WAGONS_CACHE_TTL: float = 60.0
+    WAGONS_CACHE_SIZE: int = 2048
+    # для скольких поездов помнить счетчик мест и маршруты в кеше
+    TRAINS_TRACKED: int = 4096
+    # для скольких вагонов помнить долю попаданий
+    RANKER_HISTORY_SIZE: int = 8192
+
+    WAGON_SCAN_LAZY: bool = True
+    # окно склейки сообщений одного маршрута, 0 - без склейки
+    ROUTE_BATCH_WINDOW: float = 0.0
+
+    LEDGER_CLAIM_TTL: float = 120.0
+    LEDGER_CONFIRMED_TTL: float = 60.0
+
+    INTERNAL_MAX_CONNECTIONS: int = 10
+    INTERNAL_KEEPALIVE_EXPIRY: float = 30.0
+    # окно склейки заказов, 0 - отправлять сразу
+    INTERNAL_BATCH_WINDOW: float = 0.0
+
+    OUTBOX_DIR: str = "outbox"
+    OUTBOX_SEGMENT_SIZE: int = 1024 * 1024
+    OUTBOX_FSYNC_INTERVAL: float = 0.01
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_RETRY_MAX: float = 60.0
+
+    # HTTP-сервер /metrics включается явно, заданием METRICS_PORT; для
+    # сбора снаружи контейнера нужен и METRICS_HOST=0.0.0.0
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int | None = None
+
+    # трассировка сообщений в JSONL, пишется доля TRACE_SAMPLE_RATE трасс
+    TRACE_ENABLED: bool = False
+    TRACE_SAMPLE_RATE: float = 0.1
+    TRACE_FILE: str = "traces.jsonl"
+    # сколько трасс может ждать фоновой записи, лишние отбрасываются
+    TRACE_QUEUE_SIZE: int = 1000
+
+    LOG_ASYNC: bool = True
+    LOG_QUEUE_SIZE: int = 10000
+
     model_config = SettingsConfigDict(env_file=".env")
 
     @property
@@ -29,14 +107,16 @@ class Settings(BaseSettings):
             "password": self.AXENIX_PASSWORD
         }
 
-    @staticmethod
-    def setup_logging() -> None:
+    def setup_logging(self) -> None:
         """Настройка логирования"""
         import yaml
         import logging.config
         with open("logging.yaml", "r") as f:
             config = yaml.safe_load(f.read())
             logging.config.dictConfig(config)
+        if self.LOG_ASYNC:
+            from app.log_queue import setup_queue_logging
+            setup_queue_logging(self.LOG_QUEUE_SIZE)
 
     @staticmethod
     def setup_architecture():
@@ -0,0 +1,215 @@
+"""
+Трассировка обработки сообщений.
+
+Каждое сообщение открывает корневой спан (Tracer.trace), вложенные спаны
+(Tracer.span, traced) наследуют его через contextvars, поэтому дерево
+сохраняется и внутри asyncio.gather. Идентификаторы трассы есть у каждого
+сообщения и попадают в логи; в файл JSONL пишется только доля
+sample_rate трасс, по строке на спан, фоновым потоком. Пока трассировка выключена, вложенные
+спаны не создаются
+"""
+import contextvars
+import functools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key: str, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = (
+        "tracer", "trace_id", "span_id", "parent_id", "name", "attrs",
+        "sampled", "records", "started_at", "start", "duration", "error",
+        "_token",
+    )
+
+    def __init__(
+            self, tracer: "Tracer", name: str, attrs: dict,
+            parent: "Span | None" = None, sampled: bool = False,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = f"{random.getrandbits(64):016x}"
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(128):032x}"
+            self.parent_id = None
+            self.sampled = sampled
+            self.records = []
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+            self.records = parent.records
+        self.error = None
+
+    def set(self, key: str, value):
+        self.attrs[key] = value
+
+    def __enter__(self):
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        current_span.reset(self._token)
+        if exc is not None:
+            self.error = repr(exc)
+        if self.sampled:
+            self.records.append(self.to_dict())
+            if self.parent_id is None:
+                self.tracer.write(self.records)
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.started_at,
+            "duration": self.duration,
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+class Tracer:
+    """
+    Трассы пишутся в файл фоновым потоком: в loop остается только
+    постановка записей в ограниченную очередь. Если поток не успевает,
+    трассы отбрасываются и учитываются в dropped
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.path = None
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+
+    def configure(self, path: str, sample_rate: float, queue_size: int = 1000):
+        """
+        Аргументы:
+            path (str): файл JSONL для трасс
+            sample_rate (float): доля записываемых трасс
+            queue_size (int): сколько трасс может ждать записи
+        """
+        self.close()
+        self.path = path
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(
+            target=self._write_loop, name="tracer", daemon=True
+        )
+        self._thread.start()
+        self.enabled = True
+
+    def trace(self, name: str, **attrs) -> Span:
+        """Корневой спан сообщения"""
+        return Span(
+            self, name, attrs,
+            sampled=self.enabled and random.random() < self.sample_rate,
+        )
+
+    def span(self, name: str, **attrs) -> Span | _NoopSpan:
+        """Вложенный спан; вне выбранной трассы ничего не записывает"""
+        parent = current_span.get()
+        if parent is None or not parent.sampled:
+            return NOOP_SPAN
+        return Span(self, name, attrs, parent)
+
+    def write(self, records: list[dict]):
+        """Ставит спаны трассы в очередь на запись без ожидания"""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(records)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        trace_queue = self._queue
+        file = None
+        try:
+            while True:
+                records = trace_queue.get()
+                if records is None:
+                    break
+                try:
+                    if file is None:
+                        file = open(self.path, "a", encoding="utf8")
+                    file.write(
+                        "".join(
+                            json.dumps(record, ensure_ascii=False, default=str) + "\n"
+                            for record in records
+                        )
+                    )
+                    # на диск сбрасывается, когда очередь разобрана
+                    if trace_queue.empty():
+                        file.flush()
+                except OSError as err:
+                    self.logger.error(f"Не удалось записать трассу: {err!r}")
+        finally:
+            if file is not None:
+                file.close()
+
+    def close(self):
+        """Дописывает очередь и останавливает поток записи"""
+        if self._thread is None:
+            return
+        self.enabled = False
+        # очередь может быть заполнена, ждем, пока поток ее разгребет
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._queue = None
+
+
+tracer = Tracer()
+
+
+def traced(name: str | None = None):
+    """Оборачивает корутину во вложенный спан"""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def log_ids() -> str | None:
+    """Идентификаторы текущей трассы и спана для логов"""
+    span = current_span.get()
+    if span is None:
+        return None
+    return f"{span.trace_id[:16]}/{span.span_id}"
@@ -0,0 +1,96 @@
+"""
+Симуляция: скорость AIMD при ступенчатой пропускной способности апстрима.
+
+Апстрим пропускает не больше capacity запросов в секунду (скрытой от
+клиента), сверх нее отвечает 429; capacity меняется ступенями. Клиенты
+шлют запросы без пауз через общий ограничитель, AIMDController
+подстраивает его скорость по ответам. Печатается средняя скорость и доля
+429 на каждой ступени, для сравнения - постоянная скорость ceiling.
+
+Время масштабировано: ступень длится STEP секунд, окно решения WINDOW.
+
+Запуск: python -m benchmarks.bench_adaptive_rate
+"""
+import asyncio
+import time
+
+from clients.adaptive_rate import AIMDController
+from clients.limiter_backends import InProcessBackend
+from clients.rate_limiter import RateLimiter
+
+CAPACITY_STEPS = [40, 15, 30, 60]
+STEP = 1.5
+WINDOW = 0.05
+FLOOR = 5
+CEILING = 80
+CLIENTS = 20
+
+
+class Upstream:
+    """Апстрим со скрытой пропускной способностью capacity rps"""
+
+    def __init__(self, capacity: float):
+        # небольшой запас на неровность таймеров цикла событий
+        self.backend = InProcessBackend(capacity, 1.0, burst=3)
+
+    def set_capacity(self, capacity: float):
+        self.backend.set_rate(capacity, 1.0)
+
+    def handle(self) -> int:
+        return 200 if self.backend.try_acquire() else 429
+
+
+async def simulate(adaptive: bool) -> list[tuple[float, float, float]]:
+    limiter = RateLimiter(CEILING)
+    controller = AIMDController(
+        limiter, FLOOR, CEILING, increase=2.0, decrease=0.7, window=WINDOW,
+    )
+    upstream = Upstream(CAPACITY_STEPS[0])
+    stats = {"rates": [], "sent": 0, "rejected": 0}
+
+    async def client():
+        while True:
+            await limiter.acquire()
+            status = upstream.handle()
+            stats["sent"] += 1
+            stats["rejected"] += status == 429
+            if adaptive:
+                controller.observe(status, 0.0)
+
+    async def sample_rate():
+        while True:
+            stats["rates"].append(limiter.rate)
+            await asyncio.sleep(WINDOW)
+
+    tasks = [asyncio.create_task(client()) for _ in range(CLIENTS)]
+    tasks.append(asyncio.create_task(sample_rate()))
+    steps = []
+    for capacity in CAPACITY_STEPS:
+        upstream.set_capacity(capacity)
+        stats.update(rates=[], sent=0, rejected=0)
+        await asyncio.sleep(STEP)
+        rates = stats["rates"]
+        steps.append((
+            capacity,
+            sum(rates) / len(rates),
+            stats["rejected"] / max(stats["sent"], 1),
+        ))
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return steps
+
+
+def main():
+    for adaptive in (False, True):
+        name = "AIMD" if adaptive else "постоянная"
+        print(f"{name}:")
+        for capacity, rate, rejected in asyncio.run(simulate(adaptive)):
+            print(
+                f"  capacity {capacity:>3} rps: скорость {rate:5.1f} rps, "
+                f"429 {rejected:6.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
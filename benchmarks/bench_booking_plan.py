@@ -0,0 +1,102 @@
+"""
+Память и время на план брони из 1000 мест: словари с pydantic-моделью
+на каждое место (как было до clients.booking_plan) против CandidateSeat
+и PlannedOrder, у которых модель запроса строится только при отправке.
+
+Запуск: python -m benchmarks.bench_booking_plan
+"""
+import timeit
+import tracemalloc
+
+from app.planner import MAX_SEATS_PER_ORDER, plan_orders
+from clients.booking_plan import CandidateSeat
+from clients.response_models import (
+    BookingOrderRequestModel, BookingOrderRequestModelV2,
+)
+
+SEATS = 1000
+WAGONS = 20
+TRAIN_ID = 7
+
+
+def found_seats() -> list[tuple[int, list[int]]]:
+    """Найденные места по вагонам: (wagon_id, [seat_id, ...])"""
+    per_wagon = SEATS // WAGONS
+    return [
+        (wagon_id, list(range(wagon_id * 1000, wagon_id * 1000 + per_wagon)))
+        for wagon_id in range(WAGONS)
+    ]
+
+
+def legacy_plan(user_id: int, wagons) -> list:
+    wagon_params = [
+        [
+            {
+                "user_id": user_id,
+                "params": BookingOrderRequestModel(
+                    train_id=TRAIN_ID, wagon_id=wagon_id, seat_ids=seat_id,
+                ),
+            }
+            for seat_id in seat_ids
+        ]
+        for wagon_id, seat_ids in wagons
+    ]
+    candidates = [
+        (params["params"].train_id, params["params"].wagon_id,
+         params["params"].seat_ids)
+        for booking_params in wagon_params
+        for params in booking_params
+    ]
+    groups = {}
+    for train_id, wagon_id, seat_id in candidates:
+        groups.setdefault((train_id, wagon_id), set()).add(seat_id)
+    result = []
+    for (train_id, wagon_id), seat_ids in sorted(
+            groups.items(), key=lambda item: (-len(item[1]), item[0])
+    ):
+        seat_ids = sorted(seat_ids)
+        for i in range(0, len(seat_ids), MAX_SEATS_PER_ORDER):
+            result.append({
+                "user_id": user_id,
+                "params": BookingOrderRequestModelV2(
+                    train_id=train_id, wagon_id=wagon_id,
+                    seat_ids=seat_ids[i:i + MAX_SEATS_PER_ORDER],
+                ),
+            })
+    return [order["params"] for order in result]
+
+
+def slotted_plan(user_id: int, wagons) -> list:
+    candidates = [
+        CandidateSeat(TRAIN_ID, wagon_id, seat_id)
+        for wagon_id, seat_ids in wagons
+        for seat_id in seat_ids
+    ]
+    return [order.to_request() for order in plan_orders(user_id, candidates)]
+
+
+def peak_memory(fn, wagons) -> int:
+    tracemalloc.start()
+    try:
+        fn(1, wagons)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    wagons = found_seats()
+    assert [m.model_dump() for m in legacy_plan(1, wagons)] == [
+        m.model_dump() for m in slotted_plan(1, wagons)
+    ]
+    runs = 200
+    for name, fn in (("dict+pydantic", legacy_plan), ("slotted", slotted_plan)):
+        elapsed = timeit.timeit(lambda: fn(1, wagons), number=runs)
+        print(
+            f"{name:>13}: {elapsed / runs * 1000:.3f} ms на план, "
+            f"пик памяти {peak_memory(fn, wagons) / 1024:.0f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
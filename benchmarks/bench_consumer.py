@@ -0,0 +1,78 @@
+"""
+Пропускная способность консьюмера на тестовом брокере FastStream.
+
+Сообщения публикуются в TestRabbitBroker разом, обработчик проходит
+AdaptiveConcurrency и делает CALLS запросов через ограничитель на RATE
+rps, как обработка заказа к Axenix. Печатаются сообщения в секунду, пик
+одновременных сообщений и p95 времени обработки по лимиту.
+
+Запуск: python -m benchmarks.bench_consumer
+"""
+import asyncio
+import statistics
+import time
+
+from faststream.rabbit import RabbitBroker, TestRabbitBroker
+
+from app.concurrency import AdaptiveConcurrency
+from app.models import Income
+from clients.rate_limiter import LimiterFlow, RateLimiter, current_flow
+
+RATE = 100
+CALLS = 3
+MESSAGES = 300
+TARGET_BACKLOG = 0.5
+
+
+async def run(max_limit: int) -> dict:
+    limiter = RateLimiter(RATE)
+    gate = AdaptiveConcurrency(
+        max_limit, lambda: limiter.queue_depth / RATE, TARGET_BACKLOG,
+    )
+    broker = RabbitBroker(logger=None)
+    seen = {"active": 0, "peak": 0, "latency": []}
+
+    @broker.subscriber("orders")
+    async def handle(body: Income):
+        await gate.acquire()
+        started = time.monotonic()
+        seen["active"] += 1
+        seen["peak"] = max(seen["peak"], seen["active"])
+        try:
+            current_flow.set(LimiterFlow(body.user_id))
+            for _ in range(CALLS):
+                await limiter.acquire()
+        finally:
+            seen["active"] -= 1
+            seen["latency"].append(time.monotonic() - started)
+            gate.release()
+
+    async with TestRabbitBroker(broker) as test_broker:
+        started = time.monotonic()
+        await asyncio.gather(*[
+            test_broker.publish({
+                "user_id": user_id, "route": "A -> B",
+                "date_from": "01.01.2030 00:00:00",
+                "date_to": "02.01.2030 00:00:00",
+            }, "orders")
+            for user_id in range(MESSAGES)
+        ])
+        elapsed = time.monotonic() - started
+    return {
+        "throughput": MESSAGES / elapsed,
+        "peak": seen["peak"],
+        "p95": statistics.quantiles(seen["latency"], n=20)[-1],
+    }
+
+
+def main():
+    for max_limit in (1, 5, 20, 100):
+        stats = asyncio.run(run(max_limit))
+        print(
+            f"лимит {max_limit:>3}: {stats['throughput']:.1f} сообщений/с, "
+            f"пик {stats['peak']}, p95 обработки {stats['p95'] * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
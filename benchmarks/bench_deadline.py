@@ -0,0 +1,85 @@
+"""
+Симуляция раннего отказа по сроку: доля отброшенных и опоздавших
+сообщений при оценке по всей очереди ограничителя и по справедливой доле.
+
+Один поток держит в очереди длинную серию запросов, остальные сообщения
+приходят по одному, делают DEADLINE_MIN_CALLS запросов и имеют случайный
+срок. Оценка по всей очереди отбрасывает почти все короткие сообщения,
+хотя справедливая очередь пропустила бы их вовремя.
+
+Запуск: python -m benchmarks.bench_deadline
+"""
+import asyncio
+import random
+import time
+
+from app.deadline import DeadlinePolicy
+from clients.rate_limiter import LimiterFlow, RateLimiter, current_flow
+
+RATE = 200
+HOG_CALLS = 600
+MESSAGES = (100, 300)
+MIN_CALLS = 3
+
+
+async def simulate(policy_name: str, messages: int, seed: int = 1) -> dict:
+    rnd = random.Random(seed)
+    limiter = RateLimiter(RATE)
+
+    def whole_backlog(calls: int, flow) -> float:
+        return (limiter.queue_depth + calls) / RATE
+
+    def fair_share(calls: int, flow) -> float:
+        return limiter.tokens_ahead(calls, flow) / RATE
+
+    policy = DeadlinePolicy(
+        whole_backlog if policy_name == "backlog" else fair_share,
+        min_calls=MIN_CALLS,
+    )
+
+    async def hog():
+        current_flow.set(LimiterFlow("hog"))
+        await asyncio.gather(*[limiter.acquire() for _ in range(HOG_CALLS)])
+
+    async def message(user_id: int, budget: float):
+        current_flow.set(LimiterFlow(user_id))
+        deadline = time.monotonic() + budget
+        if policy.should_shed(deadline, current_flow.get()):
+            return
+        for _ in range(MIN_CALLS):
+            await limiter.acquire()
+        policy.record(deadline)
+
+    hog_task = asyncio.create_task(hog())
+    await asyncio.sleep(0.05)
+    tasks = []
+    for user_id in range(messages):
+        tasks.append(asyncio.create_task(
+            message(user_id, rnd.uniform(0.1, 2.0))
+        ))
+        await asyncio.sleep(rnd.expovariate(messages / 2.5))
+    await asyncio.gather(*tasks)
+    hog_task.cancel()
+    await asyncio.gather(hog_task, return_exceptions=True)
+    served = messages - policy.shed
+    return {
+        "shed": policy.shed / messages,
+        "missed": policy.missed / served if served else 0.0,
+        "on_time": (served - policy.missed) / messages,
+    }
+
+
+def main():
+    # 100 сообщений - 120 rps поверх длинного потока, 300 - больше RATE
+    for messages in MESSAGES:
+        for policy_name in ("backlog", "fair_share"):
+            stats = asyncio.run(simulate(policy_name, messages))
+            print(
+                f"{messages:>4} сообщений, {policy_name:>10}: отброшено {stats['shed']:.0%}, "
+                f"опоздало {stats['missed']:.0%} обработанных, "
+                f"вовремя {stats['on_time']:.0%} всех"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Симуляция задержки по пользователям при смешанной нагрузке.
+
+Одно тяжелое сообщение (длинный маршрут) разом ставит в очередь HEAVY
+запросов, легкие пользователи приходят по одному и делают LIGHT запросов
+подряд. Сравниваются общая очередь (все в одном потоке) и справедливая
+очередь по user_id: печатаются перцентили времени обработки легких
+сообщений и время тяжелого.
+
+Запуск: python -m benchmarks.bench_fair_queue
+"""
+import asyncio
+import random
+import statistics
+import time
+
+from clients.rate_limiter import LimiterFlow, RateLimiter, current_flow
+
+RATE = 50
+HEAVY = 150
+LIGHT = 3
+LIGHT_USERS = 40
+
+
+async def simulate(fair: bool, seed: int = 1) -> tuple[list[float], float]:
+    rnd = random.Random(seed)
+    limiter = RateLimiter(RATE)
+
+    async def message(user_id: int, calls: int, parallel: bool) -> float:
+        started = time.monotonic()
+        current_flow.set(LimiterFlow(user_id if fair else None))
+        if parallel:
+            await asyncio.gather(*[limiter.acquire() for _ in range(calls)])
+        else:
+            for _ in range(calls):
+                await limiter.acquire()
+        return time.monotonic() - started
+
+    heavy = asyncio.create_task(message("heavy", HEAVY, parallel=True))
+    light = []
+    for user_id in range(LIGHT_USERS):
+        await asyncio.sleep(rnd.expovariate(LIGHT_USERS / 3.0))
+        light.append(asyncio.create_task(message(user_id, LIGHT, parallel=False)))
+    return list(await asyncio.gather(*light)), await heavy
+
+
+def main():
+    for fair in (False, True):
+        light, heavy = asyncio.run(simulate(fair))
+        cuts = statistics.quantiles(light, n=100)
+        name = "справедливая" if fair else "общая"
+        print(
+            f"{name:>12}: легкие p50 {cuts[49] * 1000:.0f} ms, "
+            f"p95 {cuts[94] * 1000:.0f} ms, p99 {cuts[98] * 1000:.0f} ms; "
+            f"тяжелое {heavy:.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Передача заказов во внутренний бэкенд: новый httpx.AsyncClient на каждый
+заказ (как было) против общего клиента InternalClient с пулом
+keep-alive соединений и пачками.
+
+Бэкенд подменен локальным HTTP-сервером на asyncio: он считает принятые
+соединения, отвечает 201 через RESPONSE_DELAY секунд, а на новом
+соединении сначала ждет HANDSHAKE_DELAY секунд - так выглядят TCP и TLS
+рукопожатия до удаленного хоста. ORDERS заказов приходят волнами по
+WAVE одновременных сообщений.
+
+Нужны те же переменные окружения (.env), что и для приложения.
+
+Запуск: python -m benchmarks.bench_internal_client
+"""
+import asyncio
+import time
+
+import httpx
+
+from app.settings import settings
+from clients.internal import InternalClient
+from clients.response_models import BookingOrderResponseModel
+
+ORDERS = 400
+WAVE = 20
+HANDSHAKE_DELAY = 0.03
+RESPONSE_DELAY = 0.01
+BATCH_WINDOW = 0.005
+
+
+class StandInBackend:
+    """Минимальный HTTP/1.1 сервер с keep-alive"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(HANDSHAKE_DELAY)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode().split("\r\n"):
+                    name, _, value = line.partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                await asyncio.sleep(RESPONSE_DELAY)
+                self.requests += 1
+                writer.write(
+                    b"HTTP/1.1 201 Created\r\nContent-Length: 0\r\n\r\n"
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def order(order_id: int) -> BookingOrderResponseModel:
+    return BookingOrderResponseModel(
+        train_id=1, wagon_id=2, seat_ids=[3], user_id=order_id,
+        booking_date="01.01.2030 00:00:00", order_id=order_id,
+    )
+
+
+async def save_with_new_client(url: str, body: BookingOrderResponseModel) -> bool:
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url=url, json=body.model_dump())
+        return response.status_code == 201
+
+
+async def simulate(pooled: bool) -> tuple[float, StandInBackend]:
+    backend = StandInBackend()
+    server = await asyncio.start_server(backend.handle, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()
+    url = f"http://{host}:{port}/ax-train/booked-tickets/"
+    InternalClient._InternalClient__url = url
+
+    started = time.monotonic()
+    for wave in range(0, ORDERS, WAVE):
+        bodies = [order(order_id) for order_id in range(wave, wave + WAVE)]
+        if pooled:
+            results = await asyncio.gather(*[
+                InternalClient.save_new_order(body) for body in bodies
+            ])
+        else:
+            results = await asyncio.gather(*[
+                save_with_new_client(url, body) for body in bodies
+            ])
+        assert all(results)
+    elapsed = time.monotonic() - started
+
+    await InternalClient.close()
+    server.close()
+    await server.wait_closed()
+    return elapsed, backend
+
+
+def main():
+    settings.INTERNAL_BATCH_WINDOW = BATCH_WINDOW
+    for pooled in (False, True):
+        elapsed, backend = asyncio.run(simulate(pooled))
+        name = "общий клиент" if pooled else "клиент на заказ"
+        print(
+            f"{name:>15}: {ORDERS / elapsed:.0f} заказов/с, "
+            f"соединений {backend.connections}, запросов {backend.requests}"
+        )
+
+
+if __name__ == "__main__":
+    main()
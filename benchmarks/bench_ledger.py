@@ -0,0 +1,78 @@
+"""
+Симуляция: доля впустую потраченных POST-запросов брони при
+одновременных сообщениях на один вагон, с SeatLedger и без него.
+
+MESSAGES сообщений приходят почти одновременно и хотят по одному месту
+в вагоне с SEATS свободными местами. Каждое запрашивает схему вагона
+(SCHEMA_DELAY секунд), выбирает лучшее место - с наименьшим номером - и
+отправляет бронь (POST_DELAY секунд). Бронь уже занятого места
+отклоняется, сообщение запрашивает схему заново. Без ledger сообщения,
+увидевшие одну схему, выбирают одно и то же место.
+
+Запуск: python -m benchmarks.bench_ledger
+"""
+import asyncio
+import random
+
+from app.ledger import SeatLedger
+
+MESSAGES = 30
+SEATS = 40
+SCHEMA_DELAY = 0.02
+POST_DELAY = 0.02
+ARRIVAL_SPREAD = 0.05
+TRAIN_ID, WAGON_ID = 1, 10
+
+
+async def simulate(use_ledger: bool, seed: int = 1) -> dict:
+    rnd = random.Random(seed)
+    ledger = SeatLedger()
+    booked = set()
+    stats = {"posts": 0, "wasted": 0, "schemas": 0}
+
+    async def message():
+        owner = object()
+        await asyncio.sleep(rnd.uniform(0, ARRIVAL_SPREAD))
+        try:
+            while True:
+                await asyncio.sleep(SCHEMA_DELAY)
+                stats["schemas"] += 1
+                free = [seat_id for seat_id in range(SEATS) if seat_id not in booked]
+                if use_ledger:
+                    claimed = ledger.claimed(TRAIN_ID, WAGON_ID, owner)
+                    free = [seat_id for seat_id in free if seat_id not in claimed]
+                if not free:
+                    return
+                seat_id = free[0]
+                if use_ledger:
+                    ledger.claim(TRAIN_ID, WAGON_ID, [seat_id], owner)
+                stats["posts"] += 1
+                await asyncio.sleep(POST_DELAY)
+                if seat_id in booked:
+                    stats["wasted"] += 1
+                    continue
+                booked.add(seat_id)
+                if use_ledger:
+                    ledger.confirm(TRAIN_ID, WAGON_ID, [seat_id], owner)
+                return
+        finally:
+            ledger.release_owner(owner)
+
+    await asyncio.gather(*[message() for _ in range(MESSAGES)])
+    stats["booked"] = len(booked)
+    return stats
+
+
+def main():
+    for use_ledger in (False, True):
+        stats = asyncio.run(simulate(use_ledger))
+        name = "с ledger" if use_ledger else "без ledger"
+        print(
+            f"{name:>10}: POST {stats['posts']}, впустую {stats['wasted']} "
+            f"({stats['wasted'] / stats['posts']:.0%}), схем {stats['schemas']}, "
+            f"забронировано {stats['booked']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Симуляция: время от найденного места до POST брони.
+
+Фоновые сообщения непрерывно запрашивают схемы вагонов (SEATS) через
+общий ограничитель, сообщения с найденным местом раз в BOOKING_EVERY
+секунд отправляют бронь. Сравниваются классы запросов и общая очередь,
+где бронь ждет наравне со схемами мест.
+
+Запуск: python -m benchmarks.bench_limiter_priorities
+"""
+import asyncio
+import random
+import statistics
+
+from clients.rate_limiter import (
+    LimiterFlow, RateLimiter, RequestPriority, current_flow,
+)
+
+RATE = 20
+SCANNERS = 30
+BOOKINGS = 20
+BOOKING_EVERY = 0.5
+
+
+async def simulate(priorities: bool, seed: int = 1) -> list[float]:
+    rnd = random.Random(seed)
+    limiter = RateLimiter(RATE)
+
+    async def scanner(user_id: int):
+        current_flow.set(LimiterFlow(f"scan{user_id}"))
+        while True:
+            await limiter.acquire(
+                priority=RequestPriority.SEATS if priorities
+                else RequestPriority.NORMAL
+            )
+
+    async def booking(user_id: int) -> float:
+        # место найдено, сообщение ждет токен для POST брони
+        current_flow.set(LimiterFlow(f"book{user_id}"))
+        return await limiter.acquire(
+            priority=RequestPriority.BOOKING if priorities
+            else RequestPriority.NORMAL
+        )
+
+    scanners = [asyncio.create_task(scanner(i)) for i in range(SCANNERS)]
+    await asyncio.sleep(1.0)
+    waits = []
+    for user_id in range(BOOKINGS):
+        waits.append(asyncio.create_task(booking(user_id)))
+        await asyncio.sleep(rnd.expovariate(1 / BOOKING_EVERY))
+    result = await asyncio.gather(*waits)
+    for task in scanners:
+        task.cancel()
+    await asyncio.gather(*scanners, return_exceptions=True)
+    return result
+
+
+def main():
+    for priorities in (False, True):
+        waits = sorted(asyncio.run(simulate(priorities)))
+        name = "классы" if priorities else "общая очередь"
+        print(
+            f"{name:>13}: от места до POST медиана "
+            f"{statistics.median(waits) * 1000:.0f} ms, "
+            f"максимум {waits[-1] * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Задержка цикла событий при записи логов: обработчик файла прямо в loop
+против DroppingQueueHandler с записью в фоновом потоке.
+
+WORKERS задач пишут по строке лога раз в WORK_PAUSE секунд, отдельная
+задача спит по TICK секунд и меряет, на сколько опоздало пробуждение
+(loop lag). Файловый обработчик пишет во временный каталог; раз в
+STALL_EVERY записей он замирает на STALL секунд - так выглядит диск,
+занятый чужой записью или ротацией.
+
+Запуск: python -m benchmarks.bench_log_queue
+"""
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+from app.log_queue import setup_queue_logging
+
+WORKERS = 50
+DURATION = 2.0
+TICK = 0.005
+WORK_PAUSE = 0.002
+STALL_EVERY = 200
+STALL = 0.01
+QUEUE_SIZE = 10000
+
+
+class StallingFileHandler(RotatingFileHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written = 0
+
+    def emit(self, record):
+        super().emit(record)
+        self.written += 1
+        if self.written % STALL_EVERY == 0:
+            time.sleep(STALL)
+
+
+async def measure() -> list[float]:
+    logger = logging.getLogger("bench")
+    lags = []
+    stop = time.monotonic() + DURATION
+
+    async def worker(worker_id: int):
+        while time.monotonic() < stop:
+            logger.info(f"Обработка сообщения {worker_id}")
+            await asyncio.sleep(WORK_PAUSE)
+
+    async def ticker():
+        while time.monotonic() < stop:
+            started = time.monotonic()
+            await asyncio.sleep(TICK)
+            lags.append(time.monotonic() - started - TICK)
+
+    await asyncio.gather(ticker(), *[worker(i) for i in range(WORKERS)])
+    return lags
+
+
+def run(queued: bool, directory: str) -> tuple[list[float], StallingFileHandler, dict]:
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    handler = StallingFileHandler(f"{directory}/{queued}.log", encoding="utf8")
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
+    listener = setup_queue_logging(QUEUE_SIZE) if queued else None
+    try:
+        lags = asyncio.run(measure())
+        dropped = root.handlers[0].dropped if queued else {}
+    finally:
+        if listener is not None:
+            listener.stop()
+        handler.close()
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+    return lags, handler, dropped
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for queued in (False, True):
+            lags, handler, dropped = run(queued, directory)
+            cuts = statistics.quantiles(lags, n=100)
+            name = "очередь" if queued else "файл в loop"
+            print(
+                f"{name:>11}: loop lag p50 {cuts[49] * 1000:.2f} ms, "
+                f"p99 {cuts[98] * 1000:.2f} ms, max {max(lags) * 1000:.2f} ms; "
+                f"записано {handler.written}, отброшено {sum(dropped.values())}"
+            )
+
+
+if __name__ == "__main__":
+    main()
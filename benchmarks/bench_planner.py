@@ -0,0 +1,36 @@
+"""
+Скорость планировщика заказов на больших наборах мест.
+
+Запуск: python -m benchmarks.bench_planner
+"""
+import random
+import timeit
+
+from app.planner import plan_orders
+from clients.booking_plan import CandidateSeat
+
+
+def candidates(count: int, trains: int = 5, wagons: int = 20, seed: int = 1):
+    rnd = random.Random(seed)
+    return [
+        CandidateSeat(rnd.randint(1, trains), rnd.randint(1, wagons), seat_id)
+        for seat_id in range(count)
+    ]
+
+
+def main():
+    for count in (100, 1_000, 10_000, 100_000):
+        seats = candidates(count)
+        runs = max(1, 200_000 // count)
+        for need in (None, 10):
+            elapsed = timeit.timeit(
+                lambda: plan_orders(1, seats, need=need), number=runs
+            )
+            print(
+                f"{count:>7} мест, need={need}: "
+                f"{elapsed / runs * 1000:.3f} ms на план"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Симуляция: число запросов к апстриму до первого подходящего места.
+
+Апстрим - TRAINS поездов по WAGONS вагонов. Вагон остается
+"заполненным" или "свободным" между запросами (у заполненного место
+находится редко), поезд, где свободных мест меньше, чем нужно заказу, не
+подходит целиком. Заказы идут друг за другом, каждый обходит поезда и
+вагоны, пока не найдет место: в порядке апстрима или в порядке Ranker,
+который учится на исходах прошлых запросов. Считается запрос информации
+о поезде и каждый запрос схемы мест; при 1 rps это и есть секунды до
+брони.
+
+Запуск: python -m benchmarks.bench_ranking
+"""
+import random
+import statistics
+
+from app.models import Income, WagonType
+from app.ranking import Ranker
+from clients.response_models import GetTrainsResponseModel
+
+TRAINS = 8
+WAGONS = 12
+ORDERS = 500
+FREE_WAGONS = 0.25
+HIT_FREE = 0.8
+HIT_FULL = 0.05
+
+
+def build_upstream(rnd: random.Random):
+    trains = []
+    wagons = {}
+    for train_id in range(TRAINS):
+        trains.append(GetTrainsResponseModel(
+            train_id=train_id,
+            startpoint_departure=f"01.01.2030 {rnd.randrange(24):02d}:00:00",
+            wagons_info=[],
+            available_seats_count=rnd.randrange(1, 8),
+        ))
+        wagons[train_id] = [
+            {
+                "wagon_id": train_id * 100 + index,
+                "type": rnd.choice(list(WagonType)).value,
+                "hit": HIT_FREE if rnd.random() < FREE_WAGONS else HIT_FULL,
+            }
+            for index in range(WAGONS)
+        ]
+    return trains, wagons
+
+
+def simulate(ranked: bool, seed: int = 1) -> list[int]:
+    rnd = random.Random(seed)
+    trains, wagons = build_upstream(rnd)
+    ranker = Ranker()
+    calls_per_order = []
+    for user_id in range(ORDERS):
+        order = Income(
+            user_id=user_id, route="A -> B",
+            date_from="01.01.2030 00:00:00", date_to="02.01.2030 00:00:00",
+            wagon_type=rnd.choice([None, *WagonType]),
+            seats_qty=rnd.randrange(1, 4),
+        )
+        order_trains = trains
+        if ranked:
+            order_trains = ranker.rank_trains(trains, order, need=order.seats_qty)
+        calls = 0
+        found = False
+        for train in order_trains:
+            calls += 1
+            train_wagons = wagons[train.train_id]
+            if ranked:
+                train_wagons = ranker.rank_wagons(train.train_id, train_wagons, order)
+            for wagon in train_wagons:
+                if (order.wagon_type is not None
+                        and wagon["type"] != order.wagon_type.value):
+                    continue
+                calls += 1
+                hit = (
+                    train.available_seats_count >= order.seats_qty
+                    and rnd.random() < wagon["hit"]
+                )
+                ranker.record(train.train_id, wagon["wagon_id"], hit)
+                if hit:
+                    found = True
+                    break
+            if found:
+                break
+        calls_per_order.append(calls)
+    return calls_per_order
+
+
+def main():
+    for ranked in (False, True):
+        calls = simulate(ranked)
+        cuts = statistics.quantiles(calls, n=10)
+        name = "Ranker" if ranked else "порядок апстрима"
+        print(
+            f"{name:>16}: запросов до первого места в среднем "
+            f"{statistics.mean(calls):.1f}, медиана {statistics.median(calls):.0f}, "
+            f"p90 {cuts[8]:.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Пробуждения и накладные расходы ограничителя: 500 ожидающих при лимите
+AxenixClient.request_per_seconds = 1 rps.
+
+Старый ограничитель - упрощенная копия прежнего кода get_page: каждый
+ожидающий раз в 100 ms берет asyncio.Lock и проверяет, свободен ли слот.
+RateLimiter будит ровно одного ожидающего на токен. За WINDOW секунд
+печатаются выданные токены, пробуждения и процессорное время.
+
+Запуск: python -m benchmarks.bench_rate_limiter
+"""
+import asyncio
+import time
+
+from clients.rate_limiter import RateLimiter
+
+CALLERS = 500
+RATE = 1
+WINDOW = 5.0
+POLL_INTERVAL = 0.1
+
+
+class PollingLimiter:
+    """Прежняя схема: опрос под блокировкой раз в POLL_INTERVAL"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_free = 0.0
+        self.lock = asyncio.Lock()
+        self.granted = 0
+        self.wakeups = 0
+
+    async def acquire(self):
+        while True:
+            self.wakeups += 1
+            async with self.lock:
+                now = time.monotonic()
+                if now >= self.next_free:
+                    self.next_free = now + self.interval
+                    self.granted += 1
+                    return
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+async def run(limiter) -> dict:
+    order = []
+
+    async def caller(i: int):
+        await limiter.acquire()
+        order.append(i)
+
+    cpu = time.process_time()
+    tasks = [asyncio.create_task(caller(i)) for i in range(CALLERS)]
+    await asyncio.sleep(WINDOW)
+    cpu = time.process_time() - cpu
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        "granted": limiter.granted,
+        "wakeups": limiter.wakeups,
+        "cpu": cpu,
+        "fifo": order == sorted(order),
+    }
+
+
+def main():
+    for name, factory in (
+            ("polling", lambda: PollingLimiter(RATE)),
+            ("RateLimiter", lambda: RateLimiter(RATE)),
+    ):
+        stats = asyncio.run(run(factory()))
+        print(
+            f"{name:>11}: выдано {stats['granted']}, "
+            f"пробуждений {stats['wakeups']}, "
+            f"CPU {stats['cpu'] * 1000:.0f} ms за {WINDOW:.0f} s, "
+            f"FIFO {'да' if stats['fifo'] else 'нет'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Скорость поиска групп мест подряд на синтетических поездах.
+
+Запуск: python -m benchmarks.bench_seat_allocator
+"""
+import random
+import timeit
+
+from app.seat_allocator import find_runs, rank_runs
+from clients.response_models import SeatRecord
+
+SEATS_PER_WAGON = 50
+
+
+def train(seats: int, seed: int = 1) -> dict[int, list[SeatRecord]]:
+    """Поезд из seats мест по вагонам, четверть мест занята"""
+    rnd = random.Random(seed)
+    wagons = {}
+    for seat_id in range(seats):
+        wagon_id, num = divmod(seat_id, SEATS_PER_WAGON)
+        wagons.setdefault(wagon_id, []).append(SeatRecord(
+            seat_id=seat_id, seatNum=str(num + 1), block=str(num // 4),
+            price=rnd.choice((1000, 1500, 2000)),
+            bookingStatus="BOOKED" if rnd.random() < 0.25 else "FREE",
+        ))
+    for seats_map in wagons.values():
+        rnd.shuffle(seats_map)
+    return wagons
+
+
+def free(seat: SeatRecord) -> bool:
+    return seat.booking_status == "FREE"
+
+
+def main():
+    for seats in (1_000, 10_000):
+        wagons = train(seats)
+        for qty in (2, 4):
+            runs = max(1, 200_000 // seats)
+            elapsed = timeit.timeit(
+                lambda: rank_runs({
+                    wagon_id: find_runs(seats_map, qty, free)
+                    for wagon_id, seats_map in wagons.items()
+                }),
+                number=runs,
+            )
+            print(
+                f"{seats:>6} мест, группа {qty}: "
+                f"{elapsed / runs * 1000:.3f} ms на поезд"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Память и скорость разбора схемы мест: SeatRecord через seats_adapter
+против списка GetSeatsResponseModel.
+
+Схема вагона - SEATS мест в том виде, в каком их отдает Axenix
+(seatNum, bookingStatus). Память считается tracemalloc по разобранным
+объектам, время - лучшим из нескольких прогонов timeit.
+
+Запуск: python -m benchmarks.bench_seat_models
+"""
+import gc
+import timeit
+import tracemalloc
+
+from clients.response_models import GetSeatsResponseModel, seats_adapter
+
+SEATS = 5000
+REPEAT = 5
+NUMBER = 20
+
+
+def payload() -> list[dict]:
+    return [
+        {
+            "seat_id": seat_id,
+            "seatNum": str(seat_id % 60 + 1),
+            "block": str(seat_id % 60 // 4 + 1),
+            "price": 1000 + seat_id % 7 * 100,
+            "bookingStatus": "FREE" if seat_id % 3 else "BOOKED",
+        }
+        for seat_id in range(SEATS)
+    ]
+
+
+def parse_models(raw):
+    return [GetSeatsResponseModel(**seat) for seat in raw]
+
+
+def parse_records(raw):
+    return seats_adapter.validate_python(raw)
+
+
+def memory(parse, raw) -> int:
+    gc.collect()
+    tracemalloc.start()
+    parsed = parse(raw)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(parsed) == SEATS
+    return size
+
+
+def main():
+    raw = payload()
+    # поля совпадают, алиасы разбираются одинаково
+    model, record = parse_models(raw[:1])[0], parse_records(raw[:1])[0]
+    assert (model.seat_num, model.booking_status) == (
+        record.seat_num, record.booking_status
+    )
+    for name, parse in (
+            ("GetSeatsResponseModel", parse_models),
+            ("SeatRecord", parse_records),
+    ):
+        best = min(timeit.repeat(
+            lambda: parse(raw), repeat=REPEAT, number=NUMBER
+        )) / NUMBER
+        print(
+            f"{name:>21}: {memory(parse, raw) / SEATS:.0f} байт на место, "
+            f"{SEATS / best / 1e6:.2f} млн мест/с"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Накладные расходы трассировки на обработку сообщения.
+
+Выключенная трассировка: вызов корутины напрямую против обертки traced и
+tracer.span без родительского спана, а также корневой спан, не попавший
+в выборку. Включенная (sample_rate = 1): время в loop на трассу из
+SPANS спанов - запись в файл идет в фоновом потоке, в loop остается
+постановка в очередь.
+
+Запуск: python -m benchmarks.bench_tracing
+"""
+import asyncio
+import tempfile
+import time
+
+from app.tracing import Tracer, traced, tracer
+
+CALLS = 200_000
+TRACES = 5_000
+SPANS = 10
+
+
+async def handler():
+    return None
+
+
+@traced()
+async def traced_handler():
+    return None
+
+
+async def span_handler():
+    with tracer.span("handler"):
+        return None
+
+
+async def per_call(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await fn()
+    return (time.perf_counter() - started) / calls
+
+
+async def per_trace(sampled_tracer: Tracer) -> float:
+    started = time.perf_counter()
+    for user_id in range(TRACES):
+        with sampled_tracer.trace("consume", user_id=user_id):
+            for _ in range(SPANS - 1):
+                with sampled_tracer.span("request"):
+                    pass
+    return (time.perf_counter() - started) / TRACES
+
+
+async def unsampled_root():
+    with tracer.trace("consume", user_id=1):
+        return None
+
+
+async def measure():
+    for name, fn in (
+            ("прямой вызов", handler),
+            ("traced", traced_handler),
+            ("tracer.span", span_handler),
+            ("корневой спан", unsampled_root),
+    ):
+        print(f"{name:>14}: {await per_call(fn, CALLS) * 1e9:.0f} нс на вызов")
+
+    with tempfile.TemporaryDirectory() as directory:
+        sampled_tracer = Tracer()
+        sampled_tracer.configure(
+            f"{directory}/traces.jsonl", sample_rate=1.0, queue_size=TRACES,
+        )
+        loop_time = await per_trace(sampled_tracer)
+        started = time.perf_counter()
+        sampled_tracer.close()
+        drain = time.perf_counter() - started
+    print(
+        f"включена: {loop_time * 1e6:.1f} мкс в loop на трассу из {SPANS} "
+        f"спанов, дозапись потоком {drain * 1000:.0f} ms, "
+        f"отброшено {sampled_tracer.dropped}"
+    )
+
+
+def main():
+    asyncio.run(measure())
+
+
+if __name__ == "__main__":
+    main()
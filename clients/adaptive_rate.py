@@ -0,0 +1,68 @@
+import logging
+import time
+
+from clients.rate_limiter import RateLimiter
+
+
+class AIMDController:
+    """
+    Подбирает скорость ограничителя под фактическую пропускную способность
+    апстрима (additive increase / multiplicative decrease).
+
+    Раз в window секунд скорость растет на increase, если за окно все
+    ответы были здоровыми, иначе умножается на decrease. Нездоровый ответ -
+    429, 5xx, сетевая ошибка или ответ дольше latency_threshold. Одно
+    решение на окно не дает волне ошибок обрушить скорость до floor
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+            self, limiter: RateLimiter, floor: float, ceiling: float,
+            increase: float = 0.1, decrease: float = 0.5,
+            latency_threshold: float = 5.0, window: float = 5.0,
+    ):
+        self.limiter = limiter
+        self.floor = floor
+        self.ceiling = ceiling
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_threshold = latency_threshold
+        self.window = window
+        self._last_change = time.monotonic()
+        self._congested = False
+
+    @property
+    def rate(self) -> float:
+        return self.limiter.rate
+
+    def observe(self, status_code: int | None, latency: float):
+        """
+        Аргументы:
+            status_code (int | None): статус ответа, None - ответа не было
+            latency (float): длительность запроса в секундах
+        """
+        now = time.monotonic()
+        self._congested = self._congested or (
+            status_code is None
+            or status_code == 429
+            or status_code >= 500
+            or latency > self.latency_threshold
+        )
+        if now - self._last_change < self.window:
+            return
+        if self._congested:
+            self._set_rate(self.rate * self.decrease, now)
+        else:
+            self._set_rate(self.rate + self.increase, now)
+
+    def _set_rate(self, rate: float, now: float):
+        rate = min(max(rate, self.floor), self.ceiling)
+        self._last_change = now
+        self._congested = False
+        if rate == self.rate:
+            return
+        self.logger.info(
+            f"Скорость запросов: {self.rate:.2f} -> {rate:.2f} rps"
+        )
+        self.limiter.set_rate(rate)
@@ -2,72 +2,147 @@ import asyncio
 import json
 import logging
 import time
-import uuid
 from abc import ABC
-from collections import OrderedDict
+from urllib.parse import urlsplit
 
 import httpx
 
+from app.metrics import limiter_wait_seconds, retries_total, upstream_seconds
+from app.tracing import log_ids, tracer
+from clients.adaptive_rate import AIMDController
+from clients.limiter_backends import LimiterBackend
+from clients.rate_limiter import LimiterFlow, RateLimiter, RequestPriority
+from clients.retry import CircuitBreaker, RetryBudget, RetryPolicy
+
 
 class BaseApiClientAbstract(ABC):
     seconds = 1.0
     request_per_seconds = 5
-    request_times = OrderedDict.fromkeys(
-        range(request_per_seconds), None
-    )
+    burst = 1
+    # собственные ограничения отдельных эндпоинтов:
+    # {"api/info/seats": (rate, per, burst)}
+    endpoint_limits = {}
+    # на сколько секунд очереди каждый класс приоритета опережает следующий
+    priority_aging = 5.0
+    limiter = None
+    # подбирать ли скорость по ответам апстрима в пределах
+    # [rate_floor, rate_ceiling], начиная с request_per_seconds
+    adaptive_rate = False
+    rate_floor = 0.5
+    rate_ceiling = 10.0
+    rate_controller = None
 
     max_retry_count = 5
+    retry_policy = RetryPolicy()
+    # доля ограничения запросов, которую могут занять повторы
+    retry_budget_ratio = 0.2
+    retry_budget = None
+    # ошибок подряд до отключения эндпоинта и время отключения
+    breaker_threshold = 5
+    breaker_reset = 30.0
+    breakers = None
     async_client = None
 
-    timeout_make_requests = 0.1
-    reserved_waiting_value = -1
     lock = asyncio.Lock()
 
     logger = logging.getLogger(__name__)
+    _log_levels = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "warning": logging.WARNING,
+        "error": logging.ERROR,
+        "exception": logging.ERROR,
+    }
 
     def _create_session(self):
         """Создание асинхронного клиента"""
         self.async_client = httpx.AsyncClient()
 
-    def log_with_task_id(self, level="debug", message=""):
-        current_task = asyncio.current_task()
-        task_id = current_task.get_name() if current_task else "Main"
+    def _create_limiter_backend(self) -> LimiterBackend | None:
+        """Бэкенд общих токенов, по умолчанию корзина в памяти процесса"""
+        return None
 
-        getattr(self.logger, level)(f"[{task_id}] - {message}"[:1000])
+    def _get_limiter(self) -> RateLimiter:
+        """Ограничитель общий для всех экземпляров класса клиента"""
+        cls = type(self)
+        if cls.__dict__.get("limiter") is None:
+            cls.limiter = RateLimiter(
+                self.request_per_seconds, self.seconds, self.burst,
+                endpoints=self.endpoint_limits,
+                backend=self._create_limiter_backend(),
+                aging=self.priority_aging,
+            )
+        return cls.limiter
 
-    async def make_request(self, key):
-        """
-        Аргументы:
-            key (uuid): Ключ для словаря, по которому добавить значение
+    def _get_rate_controller(self) -> AIMDController | None:
+        cls = type(self)
+        if self.adaptive_rate and cls.__dict__.get("rate_controller") is None:
+            cls.rate_controller = AIMDController(
+                self._get_limiter(), self.rate_floor, self.rate_ceiling
+            )
+        return cls.__dict__.get("rate_controller")
 
-        Возвращает:
-            tuple[bool, float]: Возможность сделать запрос и время для ожидания
+    def _observe_rate(self, status_code: int | None, latency: float):
+        controller = self._get_rate_controller()
+        if controller is not None:
+            controller.observe(status_code, latency)
+
+    def effective_rate(self) -> float:
+        """Текущая скорость ограничителя в запросах в секунду"""
+        limiter = self._get_limiter()
+        return limiter.rate / limiter.per
+
+    def _get_retry_budget(self) -> RetryBudget:
+        cls = type(self)
+        if cls.__dict__.get("retry_budget") is None:
+            cls.retry_budget = RetryBudget(
+                self.request_per_seconds, self.seconds,
+                ratio=self.retry_budget_ratio,
+            )
+        return cls.retry_budget
+
+    def _get_breaker(self, endpoint: str) -> CircuitBreaker:
+        """Предохранитель эндпоинта, общий для всех экземпляров класса"""
+        cls = type(self)
+        if cls.__dict__.get("breakers") is None:
+            cls.breakers = {}
+        breaker = cls.breakers.get(endpoint)
+        if breaker is None:
+            breaker = cls.breakers[endpoint] = CircuitBreaker(
+                endpoint, self.breaker_threshold, self.breaker_reset
+            )
+        return breaker
+
+    def limiter_backlog(self) -> float:
+        """Сколько секунд займет разбор текущей очереди ограничителя"""
+        return self._get_limiter().queue_depth / self.effective_rate()
+
+    def limiter_wait(self, calls: int, flow: LimiterFlow | None = None) -> float:
+        """Сколько секунд поток flow будет ждать calls токенов ограничителя"""
+        return self._get_limiter().tokens_ahead(calls, flow) / self.effective_rate()
+
+    def log_with_task_id(self, level="debug", message="", *args):
+        """
+        Сообщение форматируется в стиле %-аргументов и только если уровень
+        включен, поэтому в args можно передавать тяжелые объекты
         """
-        async with self.lock:
-            value = list(self.request_times.values())[0]
-            possible = True
-            remaining_time = 0
-            if value == self.reserved_waiting_value:
-                possible = False
-                remaining_time = self.timeout_make_requests
-            elif value is not None:
-                wait_time = value + self.seconds - time.time()
-                if wait_time > 0:
-                    remaining_time = wait_time
-            if possible:
-                self.request_times.popitem(last=False)
-                self.request_times.update({key: self.reserved_waiting_value})
-            return possible, remaining_time
-
-    async def update_times(self, key):
-        async with self.lock:
-            self.request_times.update({key: time.time()})
+        if not self.logger.isEnabledFor(self._log_levels[level]):
+            return
+        task_id = log_ids()
+        if task_id is None:
+            # вне обработки сообщения трассы нет
+            current_task = asyncio.current_task()
+            task_id = current_task.get_name() if current_task else "Main"
+
+        text = str(message) % args if args else str(message)
+        getattr(self.logger, level)("[%s] - %s", task_id, text[:1000])
 
     async def get_page(
             self, url, params=None, headers=None,
             method="get", limit_request=True, timeout=60,
             json_format=False, if_error_return=False,
             json_data=None, log_fails=True, expected_status=(200, ),
+            endpoint=None, priority=RequestPriority.NORMAL,
     ):
         """
         Аргументы:
@@ -80,6 +155,9 @@ class BaseApiClientAbstract(ABC):
             if_error_return (bool): возвращать ли результат сразу после ошибки
             json_data (dict | None): json параметр запроса
             log_fails (bool): при наличии ошибки выводить ли текст ответа
+            endpoint (str | None): ключ эндпоинта для ограничителя,
+                по умолчанию путь из url
+            priority (int): класс запроса в очереди ограничителя
 
         Возвращает:
             (httpx.Response | dict): ответ запроса, либо декодированный в dict,
@@ -87,10 +165,9 @@ class BaseApiClientAbstract(ABC):
         """
         if self.async_client is None:
             self._create_session()
-        retry_count = 0
+        if endpoint is None:
+            endpoint = urlsplit(url).path.strip("/")
         resp_json = None
-        response = None
-        error_req = False
         args = {
             "url": url,
             "params": params,
@@ -100,118 +177,128 @@ class BaseApiClientAbstract(ABC):
         if json_data:
             args["json"] = json_data
 
-        # делаем запрос self.max_retry_count раз, пока не получим ответ
-        while retry_count < self.max_retry_count:
-            error_req = False
+        breaker = self._get_breaker(endpoint)
+        attempt = 0
+        # делаем до self.max_retry_count попыток, повторяя только
+        # временные ошибки и пока хватает бюджета повторов
+        while attempt < self.max_retry_count:
+            attempt += 1
+            # при открытом предохранителе CircuitOpenError уходит наверх,
+            # сообщение вернется в очередь
+            breaker.before_request()
             if limit_request:
-                # если требуется ограничение запросов в секунду, то проверяем
-                # возможность сделать запрос
-                key = uuid.uuid4()
-                possible = False
-                while not possible:
-                    possible, remaining_time = await self.make_request(key)
-                    if remaining_time != self.timeout_make_requests:
-                        self.log_with_task_id(
-                            level="debug",
-                            message=f"Ожидаем перед запросом {remaining_time}s"
-                        )
-                    await asyncio.sleep(remaining_time)
+                # если требуется ограничение запросов в секунду, то ждем
+                # своей очереди на токен
+                with tracer.span("limiter", endpoint=endpoint):
+                    waited = await self._get_limiter().acquire(
+                        endpoint, priority
+                    )
+                limiter_wait_seconds.observe(waited, endpoint)
+                if waited > 0:
+                    self.log_with_task_id(
+                        "debug", "Ожидали перед запросом %.2fs", waited
+                    )
+            response = None
+            error_req = False
+            retry = False
             try:
                 self.log_with_task_id(
-                    level="debug",
-                    message=f"Попытка получить данные с аргументами: {args}")
-
-                if limit_request:
-                    await self.update_times(key)
+                    "debug", "Попытка получить данные с аргументами: %s", args
+                )
 
                 time_start = time.time()
-                response = await getattr(self.async_client, method)(**args)
-                time_end = round(time.time() - time_start, 1)
+                with tracer.span(
+                        "http", endpoint=endpoint, attempt=attempt
+                ) as span:
+                    response = await getattr(self.async_client, method)(**args)
+                    span.set("status", response.status_code)
+                latency = time.time() - time_start
+                time_end = round(latency, 1)
+                upstream_seconds.observe(
+                    latency, endpoint, str(response.status_code)
+                )
+                if limit_request:
+                    self._observe_rate(response.status_code, latency)
                 resp_json = response
                 response.raise_for_status()
-            except httpx.ConnectTimeout:
+            except httpx.HTTPStatusError:
                 error_req = True
-                self.log_with_task_id(
-                    level="warning",
-                    message=(
-                        f"ConnectTimeout! Retry_count: {retry_count}, "
-                        f"args: {args}"
-                    )
+                retry = self.retry_policy.retry_status(
+                    response.status_code, method, response
                 )
-                continue
-            except httpx.ReadTimeout:
-                error_req = True
-                self.log_with_task_id(
-                    level="warning",
-                    message=(
-                        f"ReadTimeout! Retry_count: {retry_count}, "
-                        f"args: {args}"
-                    )
-                )
-                continue
-            except httpx.HTTPStatusError as err:
-                error_req = True
-                if response.status_code in [500, 501, 502, 503, 504]:
-                    self.log_with_task_id(
-                        level="warning",
-                        message=(
-                            f"Status code: {response.status_code}, "
-                            f"retry_count: {retry_count}, args: {args}"
-                        )
-                    )
-                    continue
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
                 self.log_with_task_id(
-                    level="exception",
-                    message=err
+                    "warning",
+                    "Status code: %s, attempt: %s, args: %s",
+                    response.status_code, attempt, args
                 )
-                continue
-            except httpx.RequestError as err:
+            except Exception as err:
                 error_req = True
+                retry = self.retry_policy.retry_exception(err, method)
+                if self.retry_policy.transient(err):
+                    breaker.record_failure()
+                    latency = time.time() - time_start
+                    upstream_seconds.observe(latency, endpoint, "error")
+                    if limit_request:
+                        self._observe_rate(None, latency)
                 self.log_with_task_id(
-                    level="exception",
-                    message=err
+                    "warning" if self.retry_policy.transient(err) else "exception",
+                    "%r, attempt: %s, args: %s", err, attempt, args
                 )
-                continue
-            except Exception as err:
-                error_req = True
+            else:
+                breaker.record_success()
                 self.log_with_task_id(
-                    level="exception",
-                    message=err
+                    "debug",
+                    "Ответ сервера [время запроса %s] "
+                    "[статус %s] [размер ответа %s] [url %s]",
+                    time_end, response.status_code, len(response.content), url
                 )
-                continue
-            finally:
-                if error_req:
-                    retry_count += 1
-                    if log_fails and response:
+                if response.status_code not in expected_status:
+                    # успешный, но неожиданный ответ: повтор его не изменит,
+                    # а неидемпотентный запрос выполнил бы второй раз
+                    self.log_with_task_id(
+                        "error", "Неожиданный статус %s, args: %s",
+                        response.status_code, args
+                    )
+                    break
+                elif not json_format:
+                    break
+                else:
+                    try:
+                        resp_json = response.json()
+                        break
+                    except json.JSONDecodeError:
                         self.log_with_task_id(
                             level="error",
-                            message=response.text
+                            message=f"response: {response.text}"
                         )
+                        retry = self.retry_policy.idempotent(method)
 
-                    if if_error_return:
-                        return response
-            content_len = len(response.content)
-            self.log_with_task_id(
-                level="debug",
-                message=(
-                    "Ответ сервера [время запроса {}] "
-                    "[статус {}] [размер ответа {}] [url {}]".format(
-                        time_end, response.status_code,
-                        content_len, url
-                    )
-                )
-            )
-            resp_json = response
-            if response.status_code in expected_status:
-                try:
-                    if json_format:
-                        resp_json = response.json()
-                    break
-                except json.JSONDecodeError:
+            if error_req:
+                if log_fails and response is not None:
                     self.log_with_task_id(
                         level="error",
-                        message=f"response: {response.text}"
+                        message=response.text
                     )
-                    retry_count += 1
-                    continue
+                if if_error_return:
+                    return response
+            if not retry or attempt >= self.max_retry_count:
+                break
+            if not self._get_retry_budget().try_spend():
+                self.log_with_task_id(
+                    "warning", "Бюджет повторов исчерпан, args: %s", args
+                )
+                break
+            retries_total.inc(
+                endpoint,
+                str(response.status_code) if response is not None else "error"
+            )
+            delay = self.retry_policy.backoff(attempt, response)
+            self.log_with_task_id(
+                "debug", "Повтор через %.2fs", delay
+            )
+            await asyncio.sleep(delay)
         return resp_json
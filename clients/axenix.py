@@ -1,22 +1,35 @@
 import asyncio
 import datetime
-import time
-from typing import OrderedDict
+from collections import OrderedDict
 
 from httpx import Response
 
 from app.settings import settings
+from app.tracing import traced
 from clients.api_client import BaseApiClientAbstract
+from clients.booking_plan import PlannedOrder
+from clients.cache import AsyncTTLCache, WagonSeatsCache
+from clients.limiter_backends import create_backend
+from clients.rate_limiter import RequestPriority
+from clients.retry import RetryPolicy
+from clients.token_manager import TokenManager
+from clients.train_index import TrainIndex
 from clients.response_models import BookingOrderResponseModel, GetTrainsResponseModel, \
-    GetSeatsResponseModel, BookingOrderRequestModelV2
+    BookingOrderRequestModelV2, seats_adapter, trains_adapter
 
 
 class AxenixClient(BaseApiClientAbstract):
     request_per_seconds = 1
     seconds = 1
-    request_times = OrderedDict.fromkeys(
-        range(request_per_seconds), None
+    retry_policy = RetryPolicy(
+        settings.RETRY_BASE_DELAY, settings.RETRY_MAX_DELAY
     )
+    retry_budget_ratio = settings.RETRY_BUDGET_RATIO
+    breaker_threshold = settings.BREAKER_THRESHOLD
+    breaker_reset = settings.BREAKER_RESET
+    adaptive_rate = settings.LIMITER_ADAPTIVE
+    rate_floor = settings.LIMITER_RATE_FLOOR
+    rate_ceiling = settings.LIMITER_RATE_CEILING
 
     __base_url = "http://84.252.135.231/"
     __booking_url = __base_url + "api/order"
@@ -24,9 +37,25 @@ class AxenixClient(BaseApiClientAbstract):
     __get_train_url = __base_url + "api/info/train"
     __get_wagon_url = __base_url + "api/info/seats"
     __auth_url = __base_url + "api/auth/login"
-    __auth_token = None
     __auth_token_ttl = 10
-    __auth_token_kept = None
+    # статусы брони, означающие, что места уже заняты
+    booking_conflict_statuses = (400, 409)
+
+    def __init__(self):
+        self.trains_cache = AsyncTTLCache(
+            settings.TRAINS_CACHE_TTL, settings.TRAINS_CACHE_SIZE
+        )
+        self.wagons_cache = WagonSeatsCache(
+            settings.WAGONS_CACHE_TTL, settings.WAGONS_CACHE_SIZE,
+            max_trains=settings.TRAINS_TRACKED,
+        )
+        # поезд -> закешированные маршруты с ним, для TRAINS_TRACKED
+        # последних поездов
+        self.__train_routes = OrderedDict()
+        self.tokens = TokenManager(
+            self.__auth, self.__auth_token_ttl,
+            refresh_ahead=settings.AUTH_REFRESH_AHEAD,
+        )
 
     class NoneTokenException(Exception):
         ...
@@ -34,25 +63,53 @@ class AxenixClient(BaseApiClientAbstract):
     class AuthError(Exception):
         ...
 
+    def _create_limiter_backend(self):
+        # лимит действует на весь аккаунт Axenix, поэтому реплики делят его
+        return create_backend(
+            settings.LIMITER_BACKEND, "axenix",
+            self.request_per_seconds, self.seconds, self.burst,
+            file_path=settings.LIMITER_FILE,
+            coordinator_url=settings.LIMITER_COORDINATOR_URL,
+            replicas=settings.LIMITER_REPLICAS,
+        )
+
+    def invalidate_train(self, train_id: int):
+        """Сбрасывает закешированные маршруты, в которых есть поезд"""
+        for route in self.__train_routes.pop(train_id, ()):
+            self.trains_cache.invalidate(route)
+
+    def __remember_route(self, train_id: int, route: tuple):
+        self.__train_routes.setdefault(train_id, set()).add(route)
+        self.__train_routes.move_to_end(train_id)
+        while len(self.__train_routes) > settings.TRAINS_TRACKED:
+            # без записи поезд не сбросит маршрут, поэтому сбрасываем сразу
+            _, routes = self.__train_routes.popitem(last=False)
+            for evicted in routes:
+                self.trains_cache.invalidate(evicted)
+
     async def check_token(self):
-        if self.__auth_token is None:
-            self.log_with_task_id(
-                "warning",
-                "Токен отсутствует"
-            )
-            await self.__auth()
-            return
+        """Дожидается действующего токена; обычно он уже обновлен в фоне"""
+        await self.tokens.get()
 
-        if (time.time() - self.__auth_token_kept) > self.__auth_token_ttl:
+    async def __get_authorized(self, url, **kwargs):
+        """
+        get_page с токеном авторизации. Ответ 403 означает, что токен
+        отвергнут: запрос ждет общего обновления токена и повторяется
+        один раз
+        """
+        token = await self.tokens.get()
+        response = await self.get_page(
+            url, headers={"Authorization": f"Bearer {token}"}, **kwargs
+        )
+        if isinstance(response, Response) and response.status_code == 403:
             self.log_with_task_id(
-                "warning",
-                "Токен истек"
+                "warning", "Токен отвергнут, повтор после обновления"
             )
-            await self.__auth()
-
-        self.log_with_task_id(
-            "info", "Токен в порядке"
-        )
+            token = await self.tokens.refresh(stale=token)
+            response = await self.get_page(
+                url, headers={"Authorization": f"Bearer {token}"}, **kwargs
+            )
+        return response
 
     async def __booking(self, user_id: int, body: BookingOrderRequestModelV2):
         self.log_with_task_id(
@@ -60,19 +117,22 @@ class AxenixClient(BaseApiClientAbstract):
             f"Бронирование заказ для пользователя: {user_id} "
             f"-> Места: {body.seat_ids}"
         )
-        response = await self.get_page(
+        response = await self.__get_authorized(
             self.__booking_url,
-            headers={
-                "Authorization": f"Bearer {self.__auth_token}"
-            },
             json_format=True,
             json_data=body.model_dump(),
             limit_request=True,
-            method="post"
+            method="post",
+            expected_status=(200, 201),
+            priority=RequestPriority.BOOKING,
         )
         if isinstance(response, dict):
             order_id = response.get("order_id")
             assert order_id is not None
+            self.invalidate_train(body.train_id)
+            self.wagons_cache.invalidate_wagon(
+                body.train_id, body.wagon_id, booked=len(body.seat_ids)
+            )
             self.log_with_task_id(
                 "info",
                 f"Для пользователя {user_id} успешно "
@@ -92,12 +152,12 @@ class AxenixClient(BaseApiClientAbstract):
                 f"Ошибка бронирования заказа для {user_id}. "
                 f"[{response.status_code}] - {response.text}"
             )
-            if response.status_code == 403:
-                async with self.lock:
-                    self.__auth_token = None
+            if response.status_code in self.booking_conflict_statuses:
+                self.invalidate_train(body.train_id)
+                self.wagons_cache.invalidate_wagon(body.train_id, body.wagon_id)
             return None
 
-    async def __auth(self):
+    async def __auth(self) -> str:
         self.log_with_task_id(
             "debug",
             "Попытка авторизоваться в системе Axenix"
@@ -108,15 +168,14 @@ class AxenixClient(BaseApiClientAbstract):
             json_data=settings.axenix_auth_data,
             json_format=True,
             limit_request=True,
+            priority=RequestPriority.AUTH,
         )
         if isinstance(response, dict):
             self.log_with_task_id(
                 "info",
                 "Успешная авторизация"
             )
-            async with self.lock:
-                self.__auth_token = response["token"]
-                self.__auth_token_kept = time.time()
+            return response["token"]
         elif isinstance(response, Response):
             self.log_with_task_id(
                 "error",
@@ -132,14 +191,15 @@ class AxenixClient(BaseApiClientAbstract):
             raise self.AuthError()
 
 
+    @traced()
     async def booking(
             self,
-            orders_to_booking: list[dict[str, BookingOrderRequestModelV2 | int]]
+            orders_to_booking: list[PlannedOrder]
     ) -> list[BookingOrderResponseModel | None]:
         coroutines = []
         for order in orders_to_booking:
             coroutines.append(self.__booking(
-                order["user_id"], order["params"]
+                order.user_id, order.to_request()
             ))
         self.log_with_task_id(
             "info",
@@ -148,11 +208,20 @@ class AxenixClient(BaseApiClientAbstract):
         result = await asyncio.gather(*coroutines)
         return result
 
+    @traced("get_trains")
+    async def get_trains_index(self, from_: str, to_: str) -> TrainIndex:
+        result = await self.trains_cache.get_or_load(
+            (from_, to_), lambda: self.__fetch_trains(from_, to_)
+        )
+        return result or TrainIndex([])
+
     async def get_trains(self, from_: str, to_: str):
-        response = await self.get_page(
-            self.__get_trains_url, headers={
-                "Authorization": f"Bearer {self.__auth_token}"
-            },
+        index = await self.get_trains_index(from_, to_)
+        return index.trains
+
+    async def __fetch_trains(self, from_: str, to_: str):
+        response = await self.__get_authorized(
+            self.__get_trains_url,
             json_format=True,
             limit_request=True,
             method="get",
@@ -160,41 +229,48 @@ class AxenixClient(BaseApiClientAbstract):
                 "booking_available": True,
                 "start_point": from_,
                 "end_point": to_
-            }
+            },
+            priority=RequestPriority.TRAIN_INFO,
         )
         if isinstance(response, list):
             self.log_with_task_id(
                 "info",
                 f"Маршруты для {from_} -> {to_} успешно получены"
             )
-            result = list(map(
-                lambda x: GetTrainsResponseModel.model_validate(x),
-                response
-            ))
-            return result
+            result = trains_adapter.validate_python(response)
+            for train in result:
+                self.__remember_route(train.train_id, (from_, to_))
+                self.wagons_cache.observe_train(
+                    train.train_id, train.available_seats_count
+                )
+            return TrainIndex(result)
         elif isinstance(response, Response):
             self.log_with_task_id(
                 "error",
                 f"Ошибка в получения маршрутов для {from_} -> {to_}. "
                 f"[{response.status_code}] - {response.text}"
             )
-            return []
+            return None
 
     async def get_train_by_id(self, train_id: int):
-        response = await self.get_page(
-            self.__get_train_url + f"/{train_id}", headers={
-                "Authorization": f"Bearer {self.__auth_token}"
-            },
+        response = await self.__get_authorized(
+            self.__get_train_url + f"/{train_id}",
             json_format=True,
             limit_request=True,
-            method="get"
+            method="get",
+            endpoint="api/info/train",
+            priority=RequestPriority.TRAIN_INFO,
         )
         if isinstance(response, dict):
             self.log_with_task_id(
                 "info",
                 f"Маршрут для {train_id} успешно получен"
             )
-            return GetTrainsResponseModel.model_validate(response)
+            train = GetTrainsResponseModel.model_validate(response)
+            self.wagons_cache.observe_train(
+                train.train_id, train.available_seats_count
+            )
+            return train
         elif isinstance(response, Response):
             self.log_with_task_id(
                 "error",
@@ -204,24 +280,29 @@ class AxenixClient(BaseApiClientAbstract):
             return []
 
     async def get_wagon_info(self, train_id: int, wagon_id: int):
-        response = await self.get_page(
+        result = await self.wagons_cache.get_or_load(
+            train_id, wagon_id,
+            lambda: self.__fetch_wagon_info(train_id, wagon_id)
+        )
+        return result or []
+
+    async def __fetch_wagon_info(self, train_id: int, wagon_id: int):
+        response = await self.__get_authorized(
             self.__get_wagon_url,
-            headers={
-                "Authorization": f"Bearer {self.__auth_token}"
-            },
             params={
                 "wagonId": wagon_id
             },
             json_format=True,
             limit_request=True,
-            method="get"
+            method="get",
+            priority=RequestPriority.SEATS,
         )
         if isinstance(response, list):
             self.log_with_task_id(
                 "info",
                 f"Данные по вагону {wagon_id} успешно получены"
             )
-            result = list(map(lambda x: GetSeatsResponseModel(**x), response))
+            result = seats_adapter.validate_python(response)
             return {
                 "train_id": train_id,
                 "wagon_id": wagon_id,
@@ -232,4 +313,4 @@ class AxenixClient(BaseApiClientAbstract):
                 "error",
                 f"Ошибка получения данных по вагону: {wagon_id}"
             )
-            return []
+            return None
@@ -0,0 +1,30 @@
+from array import array
+from dataclasses import dataclass
+
+from clients.response_models import BookingOrderRequestModelV2
+
+
+@dataclass(frozen=True, slots=True)
+class CandidateSeat:
+    """Найденное подходящее место"""
+    train_id: int
+    wagon_id: int
+    seat_id: int
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class PlannedOrder:
+    """
+    Заказ к отправке: pydantic-модель строится только в момент запроса
+    """
+    user_id: int
+    train_id: int
+    wagon_id: int
+    seat_ids: array
+
+    def to_request(self) -> BookingOrderRequestModelV2:
+        return BookingOrderRequestModelV2(
+            train_id=self.train_id,
+            wagon_id=self.wagon_id,
+            seat_ids=self.seat_ids.tolist(),
+        )
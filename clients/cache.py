@@ -0,0 +1,151 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from clients.rate_limiter import RequestBudgetExceeded
+
+
+class AsyncTTLCache:
+    """
+    LRU-кеш с TTL и single-flight: одновременные промахи по одному ключу
+    ждут один общий вызов загрузчика
+    """
+
+    def __init__(self, ttl: float, max_size: int = 256):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._inflight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._data),
+        }
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    async def get_or_load(self, key, loader):
+        """
+        Аргументы:
+            key: ключ кеша
+            loader (Callable[[], Awaitable]): загрузчик значения, результат
+                None не кешируется
+
+        Возвращает:
+            значение из кеша либо результат загрузчика
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            await asyncio.wait([inflight])
+            if not inflight.cancelled():
+                return inflight.result()
+            # загрузку отменили вместе с ее владельцем или владелец
+            # исчерпал свой бюджет запросов, пробуем сами в своем потоке
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except (asyncio.CancelledError, RequestBudgetExceeded):
+            # ошибка касается только владельца загрузки
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            # исключение уже передано ожидающим, не логируем его повторно
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if value is not None:
+                self.put(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+
+class WagonSeatsCache:
+    """
+    Кеш схем мест по вагонам.
+
+    Признак устаревания - available_seats_count поезда из get_trains и
+    get_train_by_id: если счетчик изменился, схемы вагонов этого поезда
+    сбрасываются. После собственной брони сбрасывается только забронированный
+    вагон, а ожидаемый счетчик поезда уменьшается на число мест.
+
+    Счетчики и списки вагонов хранятся для max_trains последних поездов;
+    у вытесненного поезда сбрасываются и схемы, потому что их устаревание
+    больше не отследить
+    """
+
+    def __init__(self, ttl: float, max_size: int = 2048, max_trains: int = 4096):
+        self.cache = AsyncTTLCache(ttl, max_size)
+        self.max_trains = max_trains
+        self._seats_count = OrderedDict()
+        self._wagons = OrderedDict()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+    def observe_train(self, train_id: int, available_seats_count: int):
+        known = self._seats_count.get(train_id)
+        if known is not None and known != available_seats_count:
+            self.invalidate_train(train_id)
+        self._seats_count[train_id] = available_seats_count
+        self._seats_count.move_to_end(train_id)
+        while len(self._seats_count) > self.max_trains:
+            evicted, _ = self._seats_count.popitem(last=False)
+            self.invalidate_train(evicted)
+
+    def invalidate_train(self, train_id: int):
+        for wagon_id in self._wagons.pop(train_id, ()):
+            self.cache.invalidate((train_id, wagon_id))
+
+    def invalidate_wagon(self, train_id: int, wagon_id: int, booked: int = 0):
+        self.cache.invalidate((train_id, wagon_id))
+        if booked and train_id in self._seats_count:
+            self._seats_count[train_id] -= booked
+
+    async def get_or_load(self, train_id: int, wagon_id: int, loader):
+        self._wagons.setdefault(train_id, set()).add(wagon_id)
+        self._wagons.move_to_end(train_id)
+        while len(self._wagons) > self.max_trains:
+            evicted, wagon_ids = self._wagons.popitem(last=False)
+            for evicted_wagon in wagon_ids:
+                self.cache.invalidate((evicted, evicted_wagon))
+        return await self.cache.get_or_load((train_id, wagon_id), loader)
@@ -1,8 +1,10 @@
+import asyncio
 import logging
 
 import httpx
 
 from app.settings import settings
+from app.tracing import traced
 from clients.response_models import BookingOrderResponseModel
 
 
@@ -10,24 +12,114 @@ class InternalClient:
     __headers = {
         "x-key": settings.BACK_X_KEY
     }
+    __url = "https://api.t-app.ru/ax-train/booked-tickets/"
     __logger = logging.getLogger("internalclient")
 
+    __client = None
+    __semaphore = None
+    __pending = []
+    __flush_handle = None
+    # цикл событий держит на задачи только слабые ссылки
+    __flush_tasks = set()
+
     @classmethod
-    async def save_new_order(cls, body: BookingOrderResponseModel):
-        url = "https://api.t-app.ru/ax-train/booked-tickets/"
-        async with httpx.AsyncClient(headers=cls.__headers) as client:
-            response = await client.post(
-                url=url,
-                json=body.model_dump(),
+    def __get_client(cls) -> httpx.AsyncClient:
+        """Общий клиент с пулом keep-alive соединений"""
+        if cls.__client is None:
+            cls.__client = httpx.AsyncClient(
+                headers=cls.__headers,
+                limits=httpx.Limits(
+                    max_connections=settings.INTERNAL_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.INTERNAL_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.INTERNAL_KEEPALIVE_EXPIRY,
+                ),
             )
-            if response.status_code != 201:
-                cls.__logger.error(
-                    f"Ошибка передачи заказа: {body.order_id}. "
-                    f"[{response.status_code}] - {response.text}"
+            cls.__semaphore = asyncio.Semaphore(settings.INTERNAL_MAX_CONNECTIONS)
+        return cls.__client
+
+    @classmethod
+    async def close(cls):
+        if cls.__client is not None:
+            await cls.__client.aclose()
+            cls.__client = None
+
+    @classmethod
+    @traced()
+    async def save_new_order(cls, body: BookingOrderResponseModel) -> bool:
+        """
+        Передает заказ во внутренний бэкенд. При INTERNAL_BATCH_WINDOW > 0
+        заказы одновременных сообщений копятся в течение окна и уходят одной
+        пачкой с ограниченной параллельностью
+
+        Возвращает:
+            bool: принят ли заказ бэкендом
+        """
+        if settings.INTERNAL_BATCH_WINDOW > 0:
+            return await cls.__enqueue(body)
+        return await cls.__send(body)
+
+    @classmethod
+    async def __send(cls, body: BookingOrderResponseModel) -> bool:
+        client = cls.__get_client()
+        async with cls.__semaphore:
+            try:
+                response = await client.post(
+                    url=cls.__url,
+                    json=body.model_dump(),
                 )
-                return None
-            else:
-                cls.__logger.info(
-                    "Заказ успешно передан"
+            except httpx.HTTPError as err:
+                cls.__logger.error(
+                    f"Ошибка передачи заказа: {body.order_id}. {err!r}"
                 )
-                return None
\ No newline at end of file
+                return False
+        if response.status_code != 201:
+            cls.__logger.error(
+                f"Ошибка передачи заказа: {body.order_id}. "
+                f"[{response.status_code}] - {response.text}"
+            )
+            return False
+        else:
+            cls.__logger.info(
+                "Заказ успешно передан"
+            )
+            return True
+
+    @classmethod
+    async def __enqueue(cls, body: BookingOrderResponseModel) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        cls.__pending.append((body, future))
+        if cls.__flush_handle is None:
+            cls.__flush_handle = loop.call_later(
+                settings.INTERNAL_BATCH_WINDOW, cls.__start_flush, loop
+            )
+        return await future
+
+    @classmethod
+    def __start_flush(cls, loop: asyncio.AbstractEventLoop):
+        task = loop.create_task(cls.__flush())
+        cls.__flush_tasks.add(task)
+        task.add_done_callback(cls.__flush_tasks.discard)
+
+    @classmethod
+    async def __flush(cls):
+        batch, cls.__pending = cls.__pending, []
+        cls.__flush_handle = None
+
+        by_order = {}
+        for body, future in batch:
+            by_order.setdefault(body.order_id, (body, []))[1].append(future)
+        cls.__logger.debug(
+            f"Передача пачки из {len(by_order)} заказов"
+        )
+        results = await asyncio.gather(*[
+            cls.__send(body) for body, _ in by_order.values()
+        ], return_exceptions=True)
+        for (_, futures), result in zip(by_order.values(), results):
+            for future in futures:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
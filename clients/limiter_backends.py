@@ -0,0 +1,201 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+
+import httpx
+
+
+class TokenBucket:
+    """
+    Корзина токенов в форме GCRA: хранится только теоретическое время
+    прибытия следующего запроса (TAT), без списка меток времени
+    """
+
+    def __init__(self, rate: float, per: float = 1.0, burst: int = 1):
+        self.burst = max(burst, 1)
+        self.set_rate(rate, per)
+        self._tat = 0.0
+
+    def set_rate(self, rate: float, per: float = 1.0):
+        """Меняет скорость, уже зарезервированные токены не пересчитываются"""
+        self.interval = per / rate
+        self.tolerance = self.interval * (self.burst - 1)
+
+    def delay(self, now: float) -> float:
+        """Сколько ждать до ближайшего свободного токена"""
+        return max(0.0, self._tat - self.tolerance - now)
+
+    def reserve(self, now: float) -> float:
+        """
+        Резервирует токен и возвращает задержку, через которую им можно
+        воспользоваться
+        """
+        delay = self.delay(now)
+        self._tat = max(self._tat, now) + self.interval
+        return delay
+
+
+class LimiterBackend(ABC):
+    """Источник токенов для RateLimiter"""
+
+    def try_acquire(self) -> bool:
+        """Забрать токен без ожидания, если бэкенд это умеет"""
+        return False
+
+    @abstractmethod
+    def set_rate(self, rate: float, per: float = 1.0):
+        """Меняет скорость выдачи токенов"""
+
+    @abstractmethod
+    async def reserve(self) -> float:
+        """
+        Резервирует следующий токен
+
+        Возвращает:
+            float: задержка, через которую токеном можно воспользоваться
+        """
+
+
+class InProcessBackend(LimiterBackend):
+    """Корзина в памяти процесса"""
+
+    def __init__(self, rate: float, per: float = 1.0, burst: int = 1):
+        self.bucket = TokenBucket(rate, per, burst)
+
+    def set_rate(self, rate: float, per: float = 1.0):
+        self.bucket.set_rate(rate, per)
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        if self.bucket.delay(now) == 0:
+            self.bucket.reserve(now)
+            return True
+        return False
+
+    async def reserve(self) -> float:
+        return self.bucket.reserve(time.monotonic())
+
+
+class FileBackend(LimiterBackend):
+    """
+    Корзина, общая для процессов одного хоста: TAT хранится в файле,
+    доступ к нему сериализуется через flock
+    """
+
+    def __init__(
+            self, path: str, key: str,
+            rate: float, per: float = 1.0, burst: int = 1,
+    ):
+        self.path = path
+        self.key = key
+        self.bucket = TokenBucket(rate, per, burst)
+
+    def set_rate(self, rate: float, per: float = 1.0):
+        self.bucket.set_rate(rate, per)
+
+    def _reserve_locked(self) -> float:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "r+") as f:
+                raw = f.read()
+                state = json.loads(raw) if raw else {}
+                self.bucket._tat = state.get(self.key, 0.0)
+                delay = self.bucket.reserve(time.time())
+                state[self.key] = self.bucket._tat
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            return delay
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    async def reserve(self) -> float:
+        return await asyncio.to_thread(self._reserve_locked)
+
+
+class CoordinatorBackend(LimiterBackend):
+    """
+    Токены выдает общий для реплик сервис (app.limiter_service).
+
+    Если сервис недоступен, реплика переходит на локальную корзину
+    с долей rate / replicas и раз в retry_after секунд пробует вернуться.
+    Скорость, которую сообщает реплика, сервис сводит с оценками других
+    реплик по replica
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+            self, url: str, key: str,
+            rate: float, per: float = 1.0, burst: int = 1,
+            replicas: int = 1, timeout: float = 1.0, retry_after: float = 5.0,
+            replica: str | None = None,
+    ):
+        self.url = url.rstrip("/") + "/reserve"
+        self.payload = {
+            "key": key, "rate": rate, "per": per, "burst": burst,
+            "replica": replica or f"{socket.gethostname()}:{os.getpid()}",
+        }
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.replicas = max(replicas, 1)
+        self.fallback = InProcessBackend(rate / self.replicas, per, 1)
+        self._degraded_until = 0.0
+        self._client = None
+
+    def set_rate(self, rate: float, per: float = 1.0):
+        self.payload.update(rate=rate, per=per)
+        self.fallback.set_rate(rate / self.replicas, per)
+
+    async def reserve(self) -> float:
+        if time.monotonic() < self._degraded_until:
+            return await self.fallback.reserve()
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        try:
+            response = await self._client.post(self.url, json=self.payload)
+            response.raise_for_status()
+            return float(response.json()["delay"])
+        except (httpx.HTTPError, KeyError, ValueError) as err:
+            self.logger.warning(
+                f"Координатор лимитов недоступен ({err!r}), "
+                f"переходим на локальную долю лимита"
+            )
+            self._degraded_until = time.monotonic() + self.retry_after
+            return await self.fallback.reserve()
+
+
+def create_backend(
+        kind: str, key: str, rate: float, per: float = 1.0, burst: int = 1,
+        file_path: str | None = None, coordinator_url: str | None = None,
+        replicas: int = 1,
+) -> LimiterBackend:
+    """
+    Аргументы:
+        kind (str): memory | file | coordinator
+        key (str): имя общего лимита
+        file_path (str | None): файл состояния для file
+        coordinator_url (str | None): адрес сервиса для coordinator
+        replicas (int): число реплик, делящих лимит
+
+    Возвращает:
+        LimiterBackend: бэкенд ограничителя
+    """
+    if kind == "memory":
+        return InProcessBackend(rate, per, burst)
+    if kind == "file":
+        return FileBackend(file_path, key, rate, per, burst)
+    if kind == "coordinator":
+        return CoordinatorBackend(
+            coordinator_url, key, rate, per, burst, replicas=replicas
+        )
+    raise ValueError(f"Неизвестный бэкенд ограничителя: {kind}")
@@ -0,0 +1,234 @@
+import asyncio
+import contextvars
+import enum
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+
+from clients.limiter_backends import InProcessBackend, LimiterBackend
+
+
+class RequestPriority(enum.IntEnum):
+    """Классы запросов: чем меньше значение, тем раньше выдается токен"""
+    AUTH = 0
+    BOOKING = 1
+    TRAIN_INFO = 2
+    SEATS = 3
+
+    NORMAL = 2
+
+
+class RequestBudgetExceeded(Exception):
+    """Сообщение израсходовало свой лимит запросов к апстриму"""
+
+
+@dataclass(slots=True)
+class LimiterFlow:
+    """
+    Поток запросов одного сообщения: key - по нему делится бюджет
+    (user_id), weight - вес в справедливой очереди, budget - сколько
+    запросов может сделать сообщение
+    """
+    key: object
+    weight: float = 1.0
+    budget: int | None = None
+    calls: int = field(default=0)
+
+
+current_flow: contextvars.ContextVar[LimiterFlow | None] = contextvars.ContextVar(
+    "current_flow", default=None
+)
+
+
+class RateLimiter:
+    """
+    Асинхронный ограничитель запросов со справедливой очередью по
+    приоритетам.
+
+    Ожидающие не опрашивают ограничитель по таймеру: единственная задача
+    диспетчера спит до появления токена и будит ровно одного ожидающего.
+
+    Очередь - start-time fair queuing по потокам (current_flow, обычно
+    user_id): метка запроса S = max(V, F[поток]), F[поток] = S + 1 / weight,
+    где V - метка последнего выданного токена. Так одно сообщение с сотней
+    запросов не задерживает остальных пользователей больше, чем на их долю.
+    К метке добавляется priority * aging секунд, переведенных в токены:
+    запрос младшего класса пропускает вперед старшие. Поток новых
+    потоков не сдвигает V, поэтому одной метки мало: запрос, ждущий
+    дольше priority * aging секунд, выдается вне очереди по меткам, раньше
+    остальных просроченных с более поздним сроком. Так голодания нет.
+    Внутри одного потока и класса порядок FIFO.
+
+    Для отдельных эндпоинтов можно задать собственные корзины, которые
+    проверяются перед общей. Источник общих токенов задается бэкендом
+    (см. clients.limiter_backends), по умолчанию корзина в памяти процесса
+    """
+
+    def __init__(
+            self, rate: float, per: float = 1.0, burst: int = 1,
+            endpoints: dict[str, tuple] | None = None,
+            backend: LimiterBackend | None = None,
+            aging: float = 5.0,
+    ):
+        self.backend = backend or InProcessBackend(rate, per, burst)
+        self.endpoints = {
+            endpoint: RateLimiter(*limits)
+            for endpoint, limits in (endpoints or {}).items()
+        }
+        self.rate = rate
+        self.per = per
+        self.aging = aging
+        self.aging_tokens = aging * rate / per
+        self._virtual_time = 0.0
+        self._finish = {}
+        self._waiters = []
+        # те же ожидающие по сроку priority * aging секунд от прихода
+        self._overdue = []
+        self._pending = 0
+        # токен, взятый диспетчером для уже отмененных ожидающих
+        self._spare = False
+        self._counter = itertools.count()
+        self._dispatcher = None
+
+        self.granted = 0
+        self.wakeups = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    def tokens_ahead(self, calls: int, flow: LimiterFlow | None = None) -> int:
+        """
+        Сколько токенов будет выдано, пока новый поток flow получит calls
+        своих. В справедливой очереди его опережают только запросы с
+        меньшей меткой, то есть примерно по одному на каждый активный
+        поток за каждый свой запрос, а не вся очередь
+
+        Аргументы:
+            calls (int): сколько запросов сделает поток
+            flow (LimiterFlow | None): поток, по умолчанию без ключа
+
+        Возвращает:
+            int: число токенов, включая calls собственных
+        """
+        key = flow.key if flow is not None else None
+        weight = flow.weight if flow is not None else 1.0
+        start = max(self._virtual_time, self._finish.get(key, 0.0))
+        horizon = start + calls / weight + RequestPriority.NORMAL * self.aging_tokens
+        ahead = sum(
+            1 for order, *_, waiter in self._waiters
+            if order < horizon and not waiter.done()
+        )
+        return ahead + calls
+
+    def set_rate(self, rate: float):
+        """Меняет скорость общей корзины, корзины эндпоинтов не трогает"""
+        self.rate = rate
+        self.aging_tokens = self.aging * rate / self.per
+        self.backend.set_rate(rate, self.per)
+
+    async def acquire(
+            self, endpoint: str | None = None,
+            priority: int = RequestPriority.NORMAL,
+    ):
+        """
+        Поток запроса берется из current_flow; если у потока исчерпан
+        budget, выбрасывается RequestBudgetExceeded
+
+        Аргументы:
+            endpoint (str | None): эндпоинт, для которого задана своя корзина
+            priority (int): класс запроса, см. RequestPriority
+
+        Возвращает:
+            float: время, проведенное в ожидании токена
+        """
+        time_start = time.monotonic()
+        flow = current_flow.get()
+        if flow is not None:
+            if flow.budget is not None and flow.calls >= flow.budget:
+                raise RequestBudgetExceeded(
+                    f"Исчерпан бюджет в {flow.budget} запросов"
+                )
+            flow.calls += 1
+
+        child = self.endpoints.get(endpoint)
+        if child is not None:
+            await child._wait(priority, flow)
+        await self._wait(priority, flow)
+        return time.monotonic() - time_start
+
+    async def _wait(self, priority: int, flow: LimiterFlow | None):
+        loop = asyncio.get_running_loop()
+        if not self._pending and (self._take_spare() or self.backend.try_acquire()):
+            self.granted += 1
+            return
+
+        waiter = loop.create_future()
+        key = flow.key if flow is not None else None
+        weight = flow.weight if flow is not None else 1.0
+        start = max(self._virtual_time, self._finish.get(key, 0.0))
+        self._finish[key] = start + 1 / weight
+        counter = next(self._counter)
+        heapq.heappush(self._waiters, (
+            start + priority * self.aging_tokens, counter, start, waiter
+        ))
+        heapq.heappush(self._overdue, (
+            time.monotonic() + priority * self.aging, counter, start, waiter
+        ))
+        self._pending += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if not waiter.done() or waiter.cancelled():
+                self._pending -= 1
+            raise
+
+    def _take_spare(self) -> bool:
+        spare, self._spare = self._spare, False
+        return spare
+
+    def _pop_waiter(self):
+        while self._overdue and self._overdue[0][-1].done():
+            heapq.heappop(self._overdue)
+        if self._overdue and self._overdue[0][0] <= time.monotonic():
+            queue = self._overdue
+        else:
+            queue = self._waiters
+        while queue:
+            *_, start, waiter = heapq.heappop(queue)
+            if not waiter.done():
+                self._virtual_time = max(self._virtual_time, start)
+                return waiter
+        return None
+
+    def _forget_idle_flows(self):
+        if len(self._finish) < 1024:
+            return
+        self._finish = {
+            key: finish for key, finish in self._finish.items()
+            if finish > self._virtual_time
+        }
+
+    async def _dispatch(self):
+        while True:
+            while self._waiters and self._waiters[0][-1].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                break
+            if not self._take_spare():
+                delay = await self.backend.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            waiter = self._pop_waiter()
+            if waiter is None:
+                # все ожидающие отменены: токен достанется следующему запросу
+                self._spare = True
+                break
+            waiter.set_result(None)
+            self._pending -= 1
+            self._forget_idle_flows()
+            self.granted += 1
+            self.wakeups += 1
@@ -1,4 +1,8 @@
-from pydantic import BaseModel, Field, model_validator
+import datetime
+from typing import Annotated
+
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter, model_validator
+from pydantic.dataclasses import dataclass
 
 
 class BookingOrderRequestModel(BaseModel):
@@ -37,6 +41,19 @@ class GetTrainsResponseModel(BaseModel):
     wagons_info: list
     available_seats_count: int
 
+    _departure: datetime.datetime = PrivateAttr(None)
+
+    @model_validator(mode="after")
+    def parse_departure(self):
+        self._departure = datetime.datetime.strptime(
+            self.startpoint_departure, "%d.%m.%Y %H:%M:%S"
+        )
+        return self
+
+    @property
+    def departure(self) -> datetime.datetime:
+        return self._departure
+
 
 class GetWagonsInfoResponseModel(BaseModel):
     type: str
@@ -51,4 +68,18 @@ class GetSeatsResponseModel(BaseModel):
     booking_status: str = Field(..., alias='bookingStatus')
 
 
+@dataclass(slots=True, frozen=True)
+class SeatRecord:
+    """
+    Компактная запись места: те же поля, что у GetSeatsResponseModel,
+    но без __dict__ и с валидацией всего списка одним вызовом
+    """
+    seat_id: int
+    seat_num: Annotated[str, Field(alias="seatNum")]
+    block: str
+    price: int
+    booking_status: Annotated[str, Field(alias="bookingStatus")]
+
 
+seats_adapter = TypeAdapter(list[SeatRecord])
+trains_adapter = TypeAdapter(list[GetTrainsResponseModel])
@@ -0,0 +1,187 @@
+import datetime
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from clients.limiter_backends import TokenBucket
+
+
+class CircuitOpenError(Exception):
+    """Эндпоинт временно отключен предохранителем"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(
+            f"Эндпоинт {endpoint} недоступен, повтор через {retry_after:.1f}s"
+        )
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """
+    Какие ошибки повторять и сколько ждать перед повтором.
+
+    Для идемпотентных методов повторяются таймауты, сетевые ошибки и
+    статусы из retry_statuses; остальные 4xx возвращаются сразу.
+
+    Неидемпотентный запрос (POST брони) мог быть выполнен апстримом, даже
+    если ответ не дошел, поэтому он повторяется, только когда точно не
+    выполнен: соединение не установлено, 429 или 503 с Retry-After.
+
+    Задержка - экспоненциальная с полным джиттером, но не меньше
+    Retry-After из ответа
+    """
+
+    idempotent_methods = frozenset(("get", "head", "options", "put", "delete"))
+
+    def __init__(
+            self, base_delay: float = 0.5, max_delay: float = 30.0,
+            retry_statuses=(429, 500, 502, 503, 504),
+            retry_exceptions=(httpx.TimeoutException, httpx.TransportError),
+            unsent_exceptions=(httpx.ConnectError, httpx.ConnectTimeout),
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_exceptions = retry_exceptions
+        self.unsent_exceptions = unsent_exceptions
+
+    def idempotent(self, method: str) -> bool:
+        return method.lower() in self.idempotent_methods
+
+    def transient(self, err: Exception) -> bool:
+        """Сетевая ошибка или таймаут, а не ошибка в нашем коде"""
+        return isinstance(err, self.retry_exceptions)
+
+    def retry_status(
+            self, status_code: int, method: str = "get",
+            response: httpx.Response | None = None,
+    ) -> bool:
+        if status_code not in self.retry_statuses:
+            return False
+        if self.idempotent(method):
+            return True
+        return status_code == 429 or (
+            status_code == 503 and self.retry_after(response) is not None
+        )
+
+    def retry_exception(self, err: Exception, method: str = "get") -> bool:
+        if self.idempotent(method):
+            return self.transient(err)
+        return isinstance(err, self.unsent_exceptions)
+
+    def backoff(self, attempt: int, response: httpx.Response | None = None) -> float:
+        """
+        Аргументы:
+            attempt (int): номер неудачной попытки, начиная с 1
+            response (httpx.Response | None): ответ с возможным Retry-After
+
+        Возвращает:
+            float: задержка перед следующей попыткой в секундах
+        """
+        delay = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+        retry_after = self.retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    @staticmethod
+    def retry_after(response: httpx.Response | None) -> float | None:
+        if response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(
+            0.0,
+            (moment - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        )
+
+
+class RetryBudget:
+    """
+    Общий на клиент бюджет повторов: не больше ratio от ограничения
+    запросов, чтобы при деградации апстрима повторы не съедали токены
+    новых запросов
+    """
+
+    def __init__(self, rate: float, per: float = 1.0, ratio: float = 0.2):
+        self.bucket = TokenBucket(rate * ratio, per, burst=max(int(rate * ratio), 1))
+        self.spent = 0
+        self.denied = 0
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        if self.bucket.delay(now) > 0:
+            self.denied += 1
+            return False
+        self.bucket.reserve(now)
+        self.spent += 1
+        return True
+
+
+class CircuitBreaker:
+    """
+    Предохранитель эндпоинта: после failure_threshold ошибок подряд
+    запросы reset_timeout секунд сразу завершаются CircuitOpenError,
+    затем проходит один пробный запрос. Если пробный запрос не закончился
+    за reset_timeout (например, задачу отменили), пропускается следующий
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self, endpoint: str, failure_threshold: int = 5,
+            reset_timeout: float = 30.0,
+    ):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_at = None
+
+    def before_request(self):
+        if self.state == self.CLOSED:
+            return
+        now = time.monotonic()
+        elapsed = now - self._opened_at
+        if self.state == self.OPEN and elapsed >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and (
+                self._probe_at is None
+                or now - self._probe_at >= self.reset_timeout
+        ):
+            self._probe_at = now
+            return
+        since = now - (self._probe_at or self._opened_at)
+        raise CircuitOpenError(
+            self.endpoint, max(self.reset_timeout - since, 0.0)
+        )
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_at = None
@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Awaitable, Callable
+
+
+class TokenManager:
+    """
+    Токен авторизации с обновлением заранее и одним входом на всех.
+
+    Фоновая задача обновляет токен за refresh_ahead секунд до истечения
+    ttl, поэтому сообщения почти никогда не ждут входа. Если токен все же
+    нужен раньше (истек, отвергнут с 403), одновременные запросы ждут один
+    общий вход. Вход выполняется в пустом контексте, чтобы не расходовать
+    бюджет и долю ограничителя сообщения, которое его запустило
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+            self, login: Callable[[], Awaitable[str]], ttl: float,
+            refresh_ahead: float = 1.0, retry_delay: float = 1.0,
+    ):
+        self.login = login
+        self.ttl = ttl
+        self.refresh_ahead = min(refresh_ahead, ttl / 2)
+        self.retry_delay = retry_delay
+        self.logins = 0
+        self._token = None
+        self._expires_at = 0.0
+        self._refresh = None
+        self._task = None
+
+    def _valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at
+
+    async def get(self) -> str:
+        if self._valid():
+            return self._token
+        return await self.refresh()
+
+    async def refresh(self, stale: str | None = None) -> str:
+        """
+        Аргументы:
+            stale (str | None): отвергнутый токен; если его уже заменили,
+                новый вход не нужен
+
+        Возвращает:
+            str: действующий токен
+        """
+        if stale is not None and stale != self._token and self._valid():
+            return self._token
+        if self._refresh is None:
+            self._refresh = asyncio.get_running_loop().create_task(
+                self._login(), context=contextvars.Context()
+            )
+        return await asyncio.shield(self._refresh)
+
+    async def _login(self) -> str:
+        try:
+            started = time.monotonic()
+            token = await self.login()
+            self.logins += 1
+            self._token = token
+            self._expires_at = started + self.ttl
+            return token
+        finally:
+            self._refresh = None
+
+    async def run(self):
+        """Фоновое обновление токена до истечения"""
+        while True:
+            delay = self._expires_at - self.refresh_ahead - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await self.refresh()
+            except Exception as err:
+                self.logger.error(f"Не удалось обновить токен: {err!r}")
+                await asyncio.sleep(self.retry_delay)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,44 @@
+from bisect import bisect_left, bisect_right
+
+from clients.response_models import GetTrainsResponseModel
+
+
+class TrainIndex:
+    """
+    Поезда маршрута, отсортированные по времени отправления.
+
+    Отбор по окну дат - бинарный поиск и срез; поезда со свободными местами
+    хранятся отдельным отсортированным списком
+    """
+
+    def __init__(self, trains: list[GetTrainsResponseModel]):
+        self.trains = sorted(trains, key=lambda train: train.departure)
+        self.departures = [train.departure for train in self.trains]
+        self.with_seats = [
+            train for train in self.trains
+            if train.available_seats_count != 0
+        ]
+        self.with_seats_departures = [
+            train.departure for train in self.with_seats
+        ]
+
+    def __len__(self):
+        return len(self.trains)
+
+    def window(self, date_from, date_to, with_seats: bool = True):
+        """
+        Аргументы:
+            date_from (datetime): начало окна отправления
+            date_to (datetime): конец окна отправления, включительно
+            with_seats (bool): только поезда со свободными местами
+
+        Возвращает:
+            list[GetTrainsResponseModel]: поезда в окне по времени отправления
+        """
+        if with_seats:
+            trains, departures = self.with_seats, self.with_seats_departures
+        else:
+            trains, departures = self.trains, self.departures
+        lo = bisect_left(departures, date_from)
+        hi = bisect_right(departures, date_to)
+        return trains[lo:hi]
@@ -0,0 +1,10 @@
+import os
+
+# обязательные настройки без значений по умолчанию, чтобы импортировать
+# app.settings без .env
+for name in (
+        "RMQ_HOST", "RMQ_USER", "RMQ_PASSWORD", "RMQ_QUEUE",
+        "AXENIX_LOGIN", "AXENIX_PASSWORD", "BACK_X_KEY",
+):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("RMQ_PORT", "5672")
@@ -0,0 +1,57 @@
+from clients.adaptive_rate import AIMDController
+from clients.rate_limiter import RateLimiter
+
+
+def controller(rate=2.0, **kwargs):
+    kwargs = {"floor": 0.5, "ceiling": 5.0, "window": 0.0, **kwargs}
+    return AIMDController(RateLimiter(rate), **kwargs)
+
+
+def test_rate_grows_additively_while_healthy():
+    aimd = controller(increase=0.5)
+    aimd.observe(200, 0.1)
+    aimd.observe(200, 0.1)
+    assert aimd.rate == 3.0
+
+
+def test_rate_halves_on_unhealthy_response():
+    for status, latency in ((429, 0.1), (503, 0.1), (None, 0.1), (200, 10.0)):
+        aimd = controller(rate=4.0)
+        aimd.observe(status, latency)
+        assert aimd.rate == 2.0, status
+
+
+def test_rate_is_clamped_to_floor_and_ceiling():
+    aimd = controller(rate=1.0)
+    for _ in range(5):
+        aimd.observe(429, 0.1)
+    assert aimd.rate == 0.5
+
+    aimd = controller(rate=4.5, increase=1.0)
+    for _ in range(5):
+        aimd.observe(200, 0.1)
+    assert aimd.rate == 5.0
+
+
+def test_one_decision_per_window():
+    aimd = controller(rate=4.0, window=60.0)
+    aimd._last_change -= 60.0
+    for _ in range(10):
+        aimd.observe(429, 0.1)
+    assert aimd.rate == 2.0
+
+
+def test_congestion_inside_window_is_not_forgotten():
+    aimd = controller(rate=4.0, window=60.0)
+    aimd.observe(429, 0.1)
+    aimd._last_change -= 60.0
+    aimd.observe(200, 0.1)
+    assert aimd.rate == 2.0
+
+
+def test_limiter_rate_follows_controller():
+    limiter = RateLimiter(2.0)
+    aimd = AIMDController(limiter, 0.5, 5.0, increase=1.0, window=0.0)
+    aimd.observe(200, 0.1)
+    assert limiter.rate == 3.0
+    assert limiter.backend.bucket.interval == 1 / 3.0
@@ -0,0 +1,68 @@
+import asyncio
+
+from clients.cache import AsyncTTLCache, WagonSeatsCache
+from clients.rate_limiter import (
+    LimiterFlow, RateLimiter, RequestBudgetExceeded, current_flow,
+)
+
+
+def load(value):
+    async def loader():
+        return value
+    return loader
+
+
+def test_wagon_cache_forgets_old_trains():
+    async def scenario():
+        cache = WagonSeatsCache(ttl=60, max_trains=2)
+        for train_id in (1, 2, 3):
+            cache.observe_train(train_id, 10)
+            await cache.get_or_load(train_id, 1, load({"seats": [train_id]}))
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert list(cache._seats_count) == [2, 3]
+    assert list(cache._wagons) == [2, 3]
+    # схема вытесненного поезда сброшена вместе со счетчиком
+    assert cache.cache.get((1, 1)) is None
+    assert cache.cache.get((3, 1)) == {"seats": [3]}
+
+
+def test_seats_count_change_invalidates_train():
+    async def scenario():
+        cache = WagonSeatsCache(ttl=60)
+        cache.observe_train(1, 10)
+        await cache.get_or_load(1, 1, load({"seats": []}))
+        cache.observe_train(1, 9)
+        return cache
+
+    assert asyncio.run(scenario()).cache.get((1, 1)) is None
+
+
+def test_budget_of_load_owner_does_not_fail_waiters():
+    async def scenario():
+        limiter = RateLimiter(1000)
+        cache = AsyncTTLCache(ttl=60)
+        loads = []
+
+        async def loader():
+            await asyncio.sleep(0.01)
+            await limiter.acquire()
+            loads.append(current_flow.get().key)
+            return ["train"]
+
+        async def message(flow: LimiterFlow):
+            current_flow.set(flow)
+            return await cache.get_or_load(("A", "B"), loader)
+
+        owner = asyncio.create_task(message(LimiterFlow("owner", budget=0)))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(message(LimiterFlow("waiter")))
+        results = await asyncio.gather(owner, waiter, return_exceptions=True)
+        return results, loads
+
+    (owner, waiter), loads = asyncio.run(scenario())
+    assert isinstance(owner, RequestBudgetExceeded)
+    assert waiter == ["train"]
+    # ожидающий загрузил маршрут сам, в своем потоке
+    assert loads == ["waiter"]
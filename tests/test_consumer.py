@@ -0,0 +1,114 @@
+import asyncio
+import importlib
+import os
+import shutil
+
+import pytest
+from faststream.rabbit import TestRabbitBroker
+from pydantic import ValidationError
+
+from app.concurrency import AdaptiveConcurrency, PrefetchSync
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def main(tmp_path_factory):
+    """app.main, импортированный во временном каталоге: он создает logs/"""
+    workdir = tmp_path_factory.mktemp("consumer")
+    shutil.copy(os.path.join(ROOT, "logging.yaml"), workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        yield importlib.import_module("app.main")
+    finally:
+        os.chdir(cwd)
+
+
+def income(user_id: int, **fields) -> dict:
+    return {
+        "user_id": user_id, "route": "A -> B",
+        "date_from": "01.01.2030 00:00:00", "date_to": "02.01.2030 00:00:00",
+        **fields,
+    }
+
+
+def test_consumer_respects_concurrency_limit(main, monkeypatch):
+    seen = {"active": 0, "peak": 0, "users": []}
+
+    async def process_income(body, deadline):
+        seen["active"] += 1
+        seen["peak"] = max(seen["peak"], seen["active"])
+        await asyncio.sleep(0.01)
+        seen["active"] -= 1
+        seen["users"].append(body.user_id)
+        return "booked"
+
+    monkeypatch.setattr(main, "process_income", process_income)
+    monkeypatch.setattr(main.gate, "limit", 3)
+    monkeypatch.setattr(main.gate, "max_limit", 3)
+
+    async def scenario():
+        async with TestRabbitBroker(main.broker) as broker:
+            await asyncio.gather(*[
+                broker.publish(income(user_id), main.settings.RMQ_QUEUE)
+                for user_id in range(12)
+            ])
+
+    asyncio.run(scenario())
+    assert sorted(seen["users"]) == list(range(12))
+    assert seen["peak"] <= 3
+    assert main.gate.active == 0
+
+
+def test_invalid_message_is_not_processed(main, monkeypatch):
+    calls = []
+
+    async def process_income(body, deadline):
+        calls.append(body)
+        return "booked"
+
+    monkeypatch.setattr(main, "process_income", process_income)
+
+    async def scenario():
+        async with TestRabbitBroker(main.broker) as broker:
+            with pytest.raises(ValidationError):
+                await broker.publish({"user_id": 1}, main.settings.RMQ_QUEUE)
+
+    asyncio.run(scenario())
+    assert calls == []
+
+
+def test_prefetch_follows_concurrency_limit():
+    applied = []
+
+    async def set_prefetch(count: int):
+        applied.append(count)
+
+    async def scenario():
+        backlog = [100.0]
+        prefetch = PrefetchSync(set_prefetch, max_prefetch=10, extra=2)
+        gate = AdaptiveConcurrency(
+            10, lambda: backlog[0], target_backlog=30.0,
+            on_change=prefetch.update,
+        )
+        prefetch.start()
+        for _ in range(7):
+            await gate.acquire()
+            gate.release()
+        await asyncio.sleep(0)
+        low = gate.limit
+        backlog[0] = 0.0
+        for _ in range(20):
+            await gate.acquire()
+            gate.release()
+            await asyncio.sleep(0)
+        await prefetch.stop()
+        return low, gate.limit
+
+    low, high = asyncio.run(scenario())
+    assert (low, high) == (1, 10)
+    # изменения склеиваются: за первую серию применен только итоговый лимит
+    assert applied[0] == 3
+    assert applied[-1] == 10
+    assert len(applied) < 20
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from app.deadline import DeadlinePolicy
+from clients.rate_limiter import LimiterFlow, RateLimiter, current_flow
+
+
+def test_new_flow_is_not_charged_for_whole_backlog():
+    async def scenario():
+        limiter = RateLimiter(1)
+        current_flow.set(LimiterFlow("hog"))
+        hog = [asyncio.ensure_future(limiter.acquire()) for _ in range(50)]
+        await asyncio.sleep(0)
+        try:
+            # опережают только запросы длинного потока с меньшей меткой
+            return limiter.queue_depth, limiter.tokens_ahead(3, LimiterFlow("new"))
+        finally:
+            for task in hog:
+                task.cancel()
+            await asyncio.gather(*hog, return_exceptions=True)
+
+    depth, ahead = asyncio.run(scenario())
+    assert depth >= 49
+    assert ahead <= 3 + 4
+
+
+def test_same_flow_waits_behind_its_own_requests():
+    async def scenario():
+        limiter = RateLimiter(1)
+        flow = LimiterFlow("user")
+        current_flow.set(flow)
+        queued = [asyncio.ensure_future(limiter.acquire()) for _ in range(10)]
+        await asyncio.sleep(0)
+        try:
+            return limiter.tokens_ahead(3, flow)
+        finally:
+            for task in queued:
+                task.cancel()
+            await asyncio.gather(*queued, return_exceptions=True)
+
+    assert asyncio.run(scenario()) >= 10
+
+
+def test_policy_sheds_only_when_estimate_misses_deadline():
+    policy = DeadlinePolicy(lambda calls, flow: calls * 1.0, min_calls=3)
+    assert not policy.should_shed(time.monotonic() + 10)
+    assert policy.should_shed(time.monotonic() + 1)
+    assert policy.shed == 1
+    policy.record(time.monotonic() - 1)
+    assert policy.missed == 1
@@ -0,0 +1,50 @@
+import asyncio
+
+from clients.rate_limiter import LimiterFlow, RateLimiter, current_flow
+
+
+async def request(limiter, served, flow):
+    current_flow.set(flow)
+    await limiter.acquire()
+    served.append(flow.key)
+
+
+def test_new_flow_is_not_queued_behind_heavy_flow():
+    async def scenario():
+        limiter = RateLimiter(500)
+        served = []
+        await limiter.acquire()
+        heavy = LimiterFlow("heavy")
+        tasks = [
+            asyncio.create_task(request(limiter, served, heavy))
+            for _ in range(20)
+        ]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(
+            request(limiter, served, LimiterFlow("light"))
+        ))
+        await asyncio.gather(*tasks)
+        return served
+
+    served = asyncio.run(scenario())
+    assert served.index("light") <= 1
+
+
+def test_flows_share_tokens_by_weight():
+    async def scenario():
+        limiter = RateLimiter(500)
+        served = []
+        await limiter.acquire()
+        heavy = LimiterFlow("double", weight=2.0)
+        light = LimiterFlow("single")
+        tasks = [
+            asyncio.create_task(request(limiter, served, flow))
+            for flow in (heavy, light)
+            for _ in range(30)
+        ]
+        await asyncio.gather(*tasks)
+        return served
+
+    first = asyncio.run(scenario())[:30]
+    assert first.count("double") == 20
+    assert first.count("single") == 10
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.settings import settings
+from clients.internal import InternalClient
+from clients.response_models import BookingOrderResponseModel
+
+
+def body(order_id: int) -> BookingOrderResponseModel:
+    return BookingOrderResponseModel(
+        train_id=1, wagon_id=2, seat_ids=[3], user_id=4,
+        booking_date="01.01.2030 00:00:00", order_id=order_id,
+    )
+
+
+@pytest.fixture
+def posted(monkeypatch):
+    """Заказы, дошедшие до бэкенда; заказ 13 бэкенд отклоняет"""
+    orders = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        order_id = json.loads(request.content)["order_id"]
+        orders.append(order_id)
+        return httpx.Response(500 if order_id == 13 else 201)
+
+    monkeypatch.setattr(settings, "INTERNAL_BATCH_WINDOW", 0.01)
+    monkeypatch.setattr(
+        InternalClient, "_InternalClient__client",
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(
+        InternalClient, "_InternalClient__semaphore", asyncio.Semaphore(2)
+    )
+    monkeypatch.setattr(InternalClient, "_InternalClient__pending", [])
+    return orders
+
+
+def test_batch_sends_each_order_once(posted):
+    async def scenario():
+        return await asyncio.gather(
+            InternalClient.save_new_order(body(1)),
+            InternalClient.save_new_order(body(2)),
+            InternalClient.save_new_order(body(1)),
+        )
+
+    assert asyncio.run(scenario()) == [True, True, True]
+    assert sorted(posted) == [1, 2]
+
+
+def test_rejected_order_fails_only_its_callers(posted):
+    async def scenario():
+        return await asyncio.gather(
+            InternalClient.save_new_order(body(13)),
+            InternalClient.save_new_order(body(2)),
+            InternalClient.save_new_order(body(13)),
+        )
+
+    assert asyncio.run(scenario()) == [False, True, False]
+    assert sorted(posted) == [2, 13]
+
+
+def test_orders_after_window_go_in_next_batch(posted):
+    async def scenario():
+        first = await InternalClient.save_new_order(body(1))
+        second = await InternalClient.save_new_order(body(1))
+        return first, second
+
+    assert asyncio.run(scenario()) == (True, True)
+    assert posted == [1, 1]
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import ledger as ledger_module
+from app.ledger import SeatLedger
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ledger_module, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def test_claims_hide_seats_from_other_owners_only(clock):
+    ledger = SeatLedger()
+    first, second = object(), object()
+    ledger.claim(1, 10, [1, 2], first)
+
+    assert ledger.claimed(1, 10, first) == set()
+    assert ledger.claimed(1, 10, second) == {1, 2}
+    assert ledger.claimed(1, 11, second) == set()
+
+
+def test_release_owner_frees_unconfirmed_claims(clock):
+    ledger = SeatLedger()
+    first, second = object(), object()
+    ledger.claim(1, 10, [1, 2], first)
+    ledger.claim(1, 10, [3], second)
+    ledger.release_owner(first)
+
+    assert ledger.claimed(1, 10, second) == set()
+    assert ledger.claimed(1, 10, first) == {3}
+
+
+def test_confirmed_seats_outlive_owner_release(clock):
+    ledger = SeatLedger(claim_ttl=120, confirmed_ttl=60)
+    owner, other = object(), object()
+    ledger.claim(1, 10, [1, 2], owner)
+    ledger.confirm(1, 10, [1], owner)
+    ledger.release_owner(owner)
+
+    # подтвержденное место скрыто и от самого сообщения
+    assert ledger.claimed(1, 10, other) == {1}
+    assert ledger.claimed(1, 10, owner) == {1}
+    clock.now += 61
+    assert ledger.claimed(1, 10, other) == set()
+
+
+def test_claims_expire_after_ttl(clock):
+    ledger = SeatLedger(claim_ttl=5, confirmed_ttl=5)
+    owner, other = object(), object()
+    ledger.claim(1, 10, [1], owner)
+    clock.now += 4
+    assert ledger.claimed(1, 10, other) == {1}
+    clock.now += 2
+    assert ledger.claimed(1, 10, other) == set()
+
+    # просроченные заявки вычищаются при следующей заявке
+    ledger.claim(2, 20, [5], other)
+    assert (1, 10) not in ledger._claims
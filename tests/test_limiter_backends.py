@@ -0,0 +1,104 @@
+import asyncio
+import multiprocessing
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+
+from app import limiter_service
+from clients.limiter_backends import create_backend
+from clients.rate_limiter import RateLimiter
+
+RATE = 20
+DURATION = 1.5
+PROCESSES = 3
+
+
+def worker(
+        kind: str, target: str, replicas: int, barrier=None, results=None,
+) -> list[float]:
+    """Реплика: берет токены, сколько успеет за окно, и отдает время выдачи"""
+    async def run():
+        limiter = RateLimiter(RATE, backend=create_backend(
+            kind, "test", RATE, file_path=target, coordinator_url=target,
+            replicas=replicas,
+        ))
+        # первый запрос открывает соединение с координатором, его время
+        # не должно попадать в окно измерения
+        await limiter.acquire()
+        if barrier is not None:
+            barrier.wait()
+        start_at = time.time()
+        grants = []
+        while time.time() < start_at + DURATION:
+            await limiter.acquire()
+            grants.append(time.time())
+        return [grant for grant in grants if grant < start_at + DURATION]
+
+    grants = asyncio.run(run())
+    if results is not None:
+        results.put(grants)
+    return grants
+
+
+def run_replicas(kind: str, target: str, replicas: int = PROCESSES) -> list[float]:
+    ctx = multiprocessing.get_context("spawn")
+    # окно измерения начинается, когда все реплики запущены
+    barrier = ctx.Barrier(replicas)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(kind, target, replicas, barrier, results))
+        for _ in range(replicas)
+    ]
+    for process in processes:
+        process.start()
+    grants = [grant for _ in processes for grant in results.get(timeout=60)]
+    for process in processes:
+        process.join()
+    return grants
+
+
+def assert_global_rate(grants: list[float], rate: float):
+    expected = rate * DURATION
+    # +2: первый токен без ожидания и погрешность границ окна
+    assert 0.8 * expected <= len(grants) <= expected + 2
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def coordinator():
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        limiter_service.app, host="127.0.0.1", port=port, log_level="warning",
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    limiter_service.buckets.clear()
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join()
+
+
+def test_file_backend_holds_global_rate(tmp_path):
+    grants = run_replicas("file", str(tmp_path / "limiter.json"))
+    assert_global_rate(grants, RATE)
+
+
+def test_coordinator_holds_global_rate(coordinator):
+    grants = run_replicas("coordinator", coordinator)
+    assert_global_rate(grants, RATE)
+
+
+def test_coordinator_down_falls_back_to_replica_share():
+    # на порту никто не слушает
+    url = f"http://127.0.0.1:{free_port()}"
+    assert_global_rate(worker("coordinator", url, 4), RATE / 4)
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from clients.rate_limiter import (
+    LimiterFlow, RateLimiter, RequestPriority, current_flow,
+)
+
+
+async def request(limiter, served, name, priority, flow_key):
+    current_flow.set(LimiterFlow(flow_key))
+    await limiter.acquire(priority=priority)
+    served.append(name)
+
+
+def test_booking_goes_ahead_of_queued_seat_maps():
+    async def scenario():
+        limiter = RateLimiter(200)
+        served = []
+        await limiter.acquire()
+        seats = [
+            asyncio.create_task(request(
+                limiter, served, f"seats{i}", RequestPriority.SEATS, i
+            ))
+            for i in range(5)
+        ]
+        await asyncio.sleep(0)
+        booking = asyncio.create_task(request(
+            limiter, served, "booking", RequestPriority.BOOKING, "b"
+        ))
+        await asyncio.gather(*seats, booking)
+        return served
+
+    assert asyncio.run(scenario())[0] == "booking"
+
+
+def test_aging_bounds_wait_of_low_priority_request():
+    async def scenario():
+        # 200 rps и aging 0.05 s
+        limiter = RateLimiter(200, aging=0.05)
+        served = []
+        await limiter.acquire()
+        started = time.monotonic()
+        seats = asyncio.create_task(request(
+            limiter, served, "seats", RequestPriority.SEATS, "s"
+        ))
+        await asyncio.sleep(0)
+        bookings = []
+        # поток броней не иссякает, пока карта мест ждет
+        for i in range(200):
+            if seats.done():
+                break
+            bookings.append(asyncio.create_task(request(
+                limiter, served, f"booking{i}", RequestPriority.BOOKING, i
+            )))
+            await asyncio.sleep(0.002)
+        await seats
+        waited = time.monotonic() - started
+        for task in bookings:
+            task.cancel()
+        await asyncio.gather(*bookings, return_exceptions=True)
+        return waited, served.index("seats")
+
+    waited, position = asyncio.run(scenario())
+    # без просрочки карта мест ждала бы, пока не кончатся брони
+    assert position < 100
+    # срок SEATS - 3 * aging = 0.15 s, плюс просроченные брони перед ней
+    assert waited < 0.3
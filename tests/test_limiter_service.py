@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import limiter_service
+from clients.limiter_backends import LimiterBackend
+
+
+@pytest.fixture
+def client():
+    limiter_service.buckets.clear()
+    limiter_service.reports.clear()
+    with TestClient(limiter_service.app) as client:
+        yield client
+
+
+def reserve(client, replica: str, rate: float, key: str = "axenix"):
+    response = client.post("/reserve", json={
+        "key": key, "rate": rate, "replica": replica,
+    })
+    assert response.status_code == 200
+    return limiter_service.buckets[key].interval
+
+
+def test_bucket_runs_at_lowest_reported_rate(client):
+    assert reserve(client, "a", 10) == pytest.approx(1 / 10)
+    assert reserve(client, "b", 4) == pytest.approx(1 / 4)
+    # отчет быстрой реплики не перезаписывает медленную
+    assert reserve(client, "a", 10) == pytest.approx(1 / 4)
+    assert reserve(client, "b", 8) == pytest.approx(1 / 8)
+
+
+def test_stale_reports_expire(client, monkeypatch):
+    reserve(client, "a", 10)
+    reserve(client, "b", 2)
+    now = limiter_service.time.monotonic()
+    monkeypatch.setattr(
+        limiter_service.time, "monotonic",
+        lambda: now + limiter_service.REPORT_TTL + 1,
+    )
+    assert reserve(client, "a", 10) == pytest.approx(1 / 10)
+
+
+def test_backend_must_implement_set_rate():
+    class NoRate(LimiterBackend):
+        async def reserve(self) -> float:
+            return 0.0
+
+    with pytest.raises(TypeError):
+        NoRate()
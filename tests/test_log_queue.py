@@ -0,0 +1,51 @@
+import logging
+import queue
+
+from app.log_queue import DroppingQueueHandler, setup_queue_logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_full_queue_drops_records_and_counts_them_by_level():
+    log_queue = queue.Queue(2)
+    logger = logging.getLogger("test_log_queue.dropping")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = DroppingQueueHandler(log_queue)
+    logger.addHandler(handler)
+    try:
+        for i in range(3):
+            logger.info(f"info {i}")
+        logger.error("error")
+    finally:
+        logger.removeHandler(handler)
+
+    assert log_queue.qsize() == 2
+    assert [log_queue.get().getMessage() for _ in range(2)] == ["info 0", "info 1"]
+    assert handler.dropped == {"INFO": 1, "ERROR": 1}
+
+
+def test_root_handlers_are_moved_to_background_thread():
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    target = ListHandler()
+    root.handlers = [target]
+    root.setLevel(logging.INFO)
+    try:
+        listener = setup_queue_logging(100)
+        assert len(root.handlers) == 1
+        assert isinstance(root.handlers[0], DroppingQueueHandler)
+        logging.getLogger("test_log_queue.moved").info("через очередь")
+        listener.stop()
+    finally:
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+
+    assert target.messages == ["через очередь"]
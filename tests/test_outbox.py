@@ -0,0 +1,44 @@
+import asyncio
+
+from app.outbox import Outbox
+from clients.response_models import BookingOrderResponseModel
+
+
+def order(order_id: int) -> BookingOrderResponseModel:
+    return BookingOrderResponseModel(
+        train_id=1, wagon_id=1, seat_ids=[order_id], user_id=1,
+        booking_date="01.01.2027 00:00:00", order_id=order_id,
+    )
+
+
+async def never_delivered(body):
+    return False
+
+
+def test_cancelled_append_does_not_block_shared_fsync(tmp_path):
+    async def scenario():
+        outbox = Outbox(str(tmp_path), never_delivered, fsync_interval=0.05)
+        outbox.replay()
+        first = asyncio.create_task(outbox.append([order(1)]))
+        second = asyncio.create_task(outbox.append([order(2)]))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.wait_for(second, 1.0)
+        await outbox.stop()
+        return outbox.backlog
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_replay_restores_unacked_orders(tmp_path):
+    async def write():
+        outbox = Outbox(str(tmp_path), never_delivered)
+        outbox.replay()
+        await outbox.append([order(1), order(2)])
+        outbox._ack(1)
+        await outbox.stop()
+
+    asyncio.run(write())
+    outbox = Outbox(str(tmp_path), never_delivered)
+    outbox.replay()
+    assert set(outbox.pending) == {2}
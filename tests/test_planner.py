@@ -0,0 +1,82 @@
+import random
+
+from app.planner import MAX_SEATS_PER_ORDER, plan_orders
+from clients.booking_plan import CandidateSeat
+
+
+def seats(train_id: int, wagon_id: int, count: int, start: int = 1):
+    return [
+        CandidateSeat(train_id, wagon_id, seat_id)
+        for seat_id in range(start, start + count)
+    ]
+
+
+def as_tuples(orders):
+    return [
+        (order.user_id, order.train_id, order.wagon_id, order.seat_ids.tolist())
+        for order in orders
+    ]
+
+
+def test_wagon_is_split_into_orders_of_ten_seats():
+    orders = plan_orders(1, seats(1, 1, 25))
+    assert [len(order.seat_ids) for order in orders] == [10, 10, 5]
+    assert all(len(order.seat_ids) <= MAX_SEATS_PER_ORDER for order in orders)
+    assert sorted(
+        seat_id for order in orders for seat_id in order.seat_ids
+    ) == list(range(1, 26))
+
+
+def test_one_order_per_wagon_when_seats_fit():
+    orders = plan_orders(1, seats(1, 1, 3) + seats(1, 2, 4, start=100))
+    assert len(orders) == 2
+    assert {order.wagon_id for order in orders} == {1, 2}
+
+
+def test_other_trains_are_dropped():
+    candidates = seats(1, 1, 2) + seats(2, 5, 6, start=50) + seats(3, 7, 1, start=90)
+    orders = plan_orders(1, candidates)
+    assert {order.train_id for order in orders} == {2}
+    assert sum(len(order.seat_ids) for order in orders) == 6
+
+
+def test_other_trains_are_kept_without_single_train():
+    candidates = seats(1, 1, 2) + seats(2, 5, 6, start=50)
+    orders = plan_orders(1, candidates, single_train=False)
+    assert {order.train_id for order in orders} == {1, 2}
+
+
+def test_need_cuts_off_extra_seats():
+    candidates = seats(1, 1, 1) + seats(1, 2, 1, start=10) + seats(1, 3, 1, start=20)
+    orders = plan_orders(1, candidates, need=1)
+    assert len(orders) == 1
+    assert len(orders[0].seat_ids) == 1
+
+
+def test_need_prefers_fullest_wagons():
+    candidates = seats(1, 1, 2) + seats(1, 2, 7, start=10) + seats(1, 3, 3, start=20)
+    orders = plan_orders(1, candidates, need=9)
+    assert [(order.wagon_id, len(order.seat_ids)) for order in orders] == [
+        (2, 7), (3, 2)
+    ]
+
+
+def test_duplicate_candidates_are_booked_once():
+    orders = plan_orders(1, seats(1, 1, 3) * 2)
+    assert as_tuples(orders) == [(1, 1, 1, [1, 2, 3])]
+
+
+def test_result_does_not_depend_on_candidate_order():
+    rnd = random.Random(7)
+    candidates = [
+        CandidateSeat(rnd.randint(1, 3), rnd.randint(1, 6), rnd.randint(1, 60))
+        for _ in range(300)
+    ]
+    expected = as_tuples(plan_orders(1, candidates, need=40))
+    for _ in range(20):
+        rnd.shuffle(candidates)
+        assert as_tuples(plan_orders(1, candidates, need=40)) == expected
+
+
+def test_empty_candidates():
+    assert plan_orders(1, []) == []
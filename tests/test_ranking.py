@@ -0,0 +1,13 @@
+from app.ranking import Ranker
+
+
+def test_history_keeps_recent_wagons_only():
+    ranker = Ranker(max_size=3)
+    for wagon_id in range(5):
+        ranker.record(1, wagon_id, hit=True)
+    ranker.record(1, 2, hit=True)
+    ranker.record(1, 5, hit=False)
+
+    assert list(ranker._history) == [(1, 4), (1, 2), (1, 5)]
+    assert ranker.hit_rate(1, 0) == 0.5
+    assert ranker.hit_rate(1, 2) == (2 + 1) / (2 + 2)
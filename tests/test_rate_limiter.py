@@ -0,0 +1,86 @@
+import asyncio
+from contextlib import aclosing
+from types import SimpleNamespace
+
+from app.models import Income
+from app.service import BookingService
+from clients.limiter_backends import LimiterBackend
+from clients.rate_limiter import RateLimiter
+
+
+class CountingBackend(LimiterBackend):
+    """Выдает токен через delay секунд и считает выданные"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.issued = 0
+
+    def set_rate(self, rate: float, per: float = 1.0):
+        pass
+
+    async def reserve(self) -> float:
+        self.issued += 1
+        return self.delay
+
+
+def test_waiters_are_served_fifo_with_one_wakeup_per_token():
+    async def scenario():
+        limiter = RateLimiter(200)
+        order = []
+
+        async def caller(i: int):
+            await limiter.acquire()
+            order.append(i)
+
+        await asyncio.gather(*[caller(i) for i in range(20)])
+        return limiter, order
+
+    limiter, order = asyncio.run(scenario())
+    assert order == list(range(20))
+    assert limiter.granted == 20
+    # первый токен выдан сразу, остальные - по одному пробуждению
+    assert limiter.wakeups == 19
+
+
+def test_token_of_cancelled_waiter_goes_to_next_request():
+    async def scenario():
+        backend = CountingBackend()
+        limiter = RateLimiter(1, backend=backend)
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0.1)
+        issued = backend.issued
+        # токен уже взят у бэкенда и достается без ожидания
+        await asyncio.wait_for(limiter.acquire(), 0.01)
+        await limiter.acquire()
+        return issued, backend.issued, limiter.granted
+
+    issued, total, granted = asyncio.run(scenario())
+    assert issued == 1
+    assert total == granted == 2
+
+
+def test_closed_scan_leaves_no_running_wagon_tasks():
+    started = []
+
+    class SlowService(BookingService):
+        async def wagons_processing(self, user_id, train_id, wagon_id, order_data):
+            started.append(asyncio.current_task())
+            await asyncio.sleep(0 if wagon_id == 1 else 10)
+            return [wagon_id]
+
+    async def scenario():
+        service = SlowService(SimpleNamespace())
+        order = Income(
+            user_id=1, route="A -> B", date_from="01.01.2030 00:00:00",
+            date_to="02.01.2030 00:00:00",
+        )
+        async with aclosing(service.scan_wagons(1, 1, [1, 2, 3], order)) as scan:
+            async for res in scan:
+                assert res == [1]
+                break
+        return [task.done() for task in started]
+
+    assert asyncio.run(scenario()) == [True, True, True]
@@ -0,0 +1,188 @@
+import asyncio
+
+import httpx
+import pytest
+
+from clients.api_client import BaseApiClientAbstract
+from clients.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class FaultyUpstream:
+    """Подставной транспорт: на каждый путь - очередь ответов или ошибок"""
+
+    def __init__(self, script: dict):
+        self.script = {path: list(steps) for path, steps in script.items()}
+        self.calls = {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls[path] = self.calls.get(path, 0) + 1
+        steps = self.script[path]
+        step = steps.pop(0) if len(steps) > 1 else steps[0]
+        if isinstance(step, type) and issubclass(step, Exception):
+            raise step("fault", request=request)
+        return step
+
+
+def make_client(upstream: FaultyUpstream, **attrs):
+    """Новый класс на тест: ограничитель и предохранители общие на класс"""
+    transport = httpx.MockTransport(upstream)
+
+    def create_session(self):
+        self.async_client = httpx.AsyncClient(transport=transport)
+
+    cls = type("TestClient", (BaseApiClientAbstract,), {
+        "request_per_seconds": 1000,
+        "retry_policy": RetryPolicy(base_delay=0.001, max_delay=0.01),
+        "retry_budget_ratio": 1.0,
+        "_create_session": create_session,
+        **attrs,
+    })
+    return cls()
+
+
+def ok(status=200):
+    return httpx.Response(status, json={"ok": True})
+
+
+def test_503_with_retry_after_is_retried():
+    upstream = FaultyUpstream({"/a": [
+        httpx.Response(503, headers={"Retry-After": "0"}),
+        httpx.Response(503, headers={"Retry-After": "0"}),
+        ok(),
+    ]})
+    client = make_client(upstream)
+    result = asyncio.run(client.get_page("http://x/a", json_format=True))
+    assert result == {"ok": True}
+    assert upstream.calls["/a"] == 3
+
+
+def test_retry_after_sets_minimum_delay():
+    policy = RetryPolicy(base_delay=0.001, max_delay=10)
+    response = httpx.Response(503, headers={"Retry-After": "2"})
+    assert policy.backoff(1, response) == 2
+
+
+def test_conflict_is_returned_without_retry():
+    upstream = FaultyUpstream({"/order": [httpx.Response(409, text="busy")]})
+    client = make_client(upstream)
+    result = asyncio.run(client.get_page(
+        "http://x/order", method="post", json_format=True
+    ))
+    assert isinstance(result, httpx.Response)
+    assert result.status_code == 409
+    assert upstream.calls["/order"] == 1
+
+
+def test_post_is_not_retried_after_read_timeout():
+    upstream = FaultyUpstream({"/order": [httpx.ReadTimeout, ok()]})
+    client = make_client(upstream)
+    result = asyncio.run(client.get_page("http://x/order", method="post"))
+    assert result is None
+    assert upstream.calls["/order"] == 1
+
+
+def test_post_is_not_retried_after_500_or_503_without_retry_after():
+    for status in (500, 503):
+        upstream = FaultyUpstream({"/order": [httpx.Response(status), ok()]})
+        client = make_client(upstream)
+        asyncio.run(client.get_page("http://x/order", method="post"))
+        assert upstream.calls["/order"] == 1
+
+
+def test_post_is_retried_when_request_was_not_sent():
+    upstream = FaultyUpstream({"/order": [
+        httpx.ConnectError, httpx.Response(429), ok(),
+    ]})
+    client = make_client(upstream)
+    result = asyncio.run(client.get_page(
+        "http://x/order", method="post", json_format=True
+    ))
+    assert result == {"ok": True}
+    assert upstream.calls["/order"] == 3
+
+
+def test_unexpected_success_status_is_not_retried():
+    upstream = FaultyUpstream({"/order": [ok(201)]})
+    client = make_client(upstream)
+    result = asyncio.run(client.get_page(
+        "http://x/order", method="post", json_format=True
+    ))
+    assert result.status_code == 201
+    assert upstream.calls["/order"] == 1
+
+
+def test_get_is_retried_after_read_timeout():
+    upstream = FaultyUpstream({"/a": [httpx.ReadTimeout, ok()]})
+    client = make_client(upstream)
+    result = asyncio.run(client.get_page("http://x/a", json_format=True))
+    assert result == {"ok": True}
+    assert upstream.calls["/a"] == 2
+
+
+def test_breaker_opens_and_fails_fast():
+    upstream = FaultyUpstream({"/a": [httpx.ConnectError]})
+    client = make_client(upstream, breaker_threshold=3, breaker_reset=60.0)
+
+    async def scenario():
+        with pytest.raises(CircuitOpenError):
+            await client.get_page("http://x/a")
+        calls = upstream.calls["/a"]
+        with pytest.raises(CircuitOpenError) as err:
+            await client.get_page("http://x/a")
+        assert upstream.calls["/a"] == calls
+        assert err.value.retry_after > 0
+        return calls
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_breaker_half_open_probe_closes_on_success():
+    upstream = FaultyUpstream({"/a": [
+        httpx.ConnectError, httpx.ConnectError, ok(),
+    ]})
+    client = make_client(
+        upstream, breaker_threshold=2, breaker_reset=0.05, max_retry_count=2
+    )
+
+    async def scenario():
+        await client.get_page("http://x/a")
+        with pytest.raises(CircuitOpenError):
+            await client.get_page("http://x/a")
+        await asyncio.sleep(0.06)
+        return await client.get_page("http://x/a", json_format=True)
+
+    assert asyncio.run(scenario()) == {"ok": True}
+    assert client._get_breaker("a").state == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_probe_reopens_on_failure():
+    breaker = CircuitBreaker("a", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    asyncio.run(asyncio.sleep(0.02))
+    breaker.before_request()
+    # второй запрос ждет результата пробного
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_retry_budget_stops_retries():
+    upstream = FaultyUpstream({"/a": [httpx.Response(500)]})
+    # 10 rps * 0.1 = один повтор в секунду
+    client = make_client(
+        upstream, request_per_seconds=10, retry_budget_ratio=0.1,
+        breaker_threshold=100,
+    )
+
+    async def scenario():
+        await client.get_page("http://x/a")
+        await client.get_page("http://x/a")
+
+    asyncio.run(scenario())
+    # первый вызов: запрос и один повтор, второй - без повторов
+    assert upstream.calls["/a"] == 3
+    assert client._get_retry_budget().denied == 2
@@ -0,0 +1,134 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+from app.models import Income
+from app.seat_allocator import best_run, find_runs, rank_runs
+from app.service import BookingService
+from app.settings import settings
+from clients.response_models import SeatRecord
+
+
+def seat(seat_id: int, num: int, block: str = "A", price: int = 100,
+         status: str = "FREE") -> SeatRecord:
+    return SeatRecord(
+        seat_id=seat_id, seatNum=str(num), block=block, price=price,
+        bookingStatus=status,
+    )
+
+
+def random_wagon(rnd: random.Random, size: int) -> list[SeatRecord]:
+    seats = [
+        seat(
+            num, num, block=rnd.choice("ABC"), price=rnd.choice((50, 100, 150)),
+            status=rnd.choice(("FREE", "FREE", "FREE", "BOOKED")),
+        )
+        for num in range(1, size + 1)
+    ]
+    rnd.shuffle(seats)
+    return seats
+
+
+def free(record: SeatRecord) -> bool:
+    return record.booking_status == "FREE"
+
+
+def brute_force_runs(seats, qty, is_suitable):
+    """Все окна из qty мест подряд одного блока простым перебором"""
+    runs = set()
+    by_key = {(record.block, int(record.seat_num)): record for record in seats}
+    for block, start in by_key:
+        window = [by_key.get((block, start + i)) for i in range(qty)]
+        if all(record is not None and is_suitable(record) for record in window):
+            runs.add((
+                sum(record.price for record in window), block, start,
+                tuple(record.seat_id for record in window),
+            ))
+    return runs
+
+
+def test_find_runs_matches_brute_force():
+    rnd = random.Random(6)
+    for _ in range(500):
+        seats = random_wagon(rnd, rnd.randint(0, 40))
+        qty = rnd.randint(1, 5)
+
+        runs = find_runs(seats, qty, free)
+
+        assert {
+            (run.price, run.block, run.start,
+             tuple(record.seat_id for record in run.seats))
+            for run in runs
+        } == brute_force_runs(seats, qty, free), (seats, qty)
+        assert [run.price for run in runs] == sorted(run.price for run in runs)
+
+
+def test_best_run_skips_broken_groups():
+    seats = [
+        seat(1, 1), seat(2, 2, status="BOOKED"), seat(3, 3),
+        seat(4, 4, block="B"), seat(5, 5), seat(6, 6), seat(7, 7),
+    ]
+    run = best_run(seats, 3, free)
+    assert [record.seat_id for record in run.seats] == [5, 6, 7]
+    assert best_run(seats, 4, free) is None
+
+
+def test_best_run_prefers_cheaper_group():
+    seats = [seat(num, num, price=200 if num < 4 else 100) for num in range(1, 7)]
+    assert best_run(seats, 2, free).start == 4
+
+
+def test_rank_runs_orders_wagons_by_price():
+    runs = {
+        1: find_runs([seat(1, 1, price=300), seat(2, 2, price=300)], 2, free),
+        2: [],
+        3: find_runs([
+            seat(3, 1, price=100), seat(4, 2, price=100), seat(5, 3, price=600),
+        ], 2, free),
+    }
+    assert [
+        (wagon_id, run.start) for wagon_id, run in rank_runs(runs)
+    ] == [(3, 1), (1, 1), (3, 2)]
+
+
+class FakeClient:
+    def __init__(self, wagons: dict[int, list[SeatRecord]]):
+        self.wagons = wagons
+
+    async def get_train_by_id(self, train_id: int):
+        return SimpleNamespace(
+            available_seats_count=1,
+            wagons_info=[
+                {"wagon_id": wagon_id, "type": "COUPE"}
+                for wagon_id in self.wagons
+            ],
+        )
+
+    async def get_wagon_info(self, train_id: int, wagon_id: int):
+        return {"seats": self.wagons[wagon_id]}
+
+
+def nearby_order(qty: int) -> Income:
+    return Income(
+        user_id=1, route="A -> B", date_from="01.01.2030 00:00:00",
+        date_to="02.01.2030 00:00:00", seats_qty=qty, need_nearby=True,
+    )
+
+
+def test_train_processing_books_cheapest_run_across_wagons(monkeypatch):
+    monkeypatch.setattr(settings, "WAGON_SCAN_LAZY", False)
+    service = BookingService(FakeClient({
+        1: [seat(10 + num, num, price=300) for num in range(1, 4)],
+        2: [seat(20 + num, num, price=100) for num in range(1, 4)],
+        3: [seat(30 + num, num * 2, price=50) for num in range(1, 4)],
+    }))
+    order = nearby_order(2)
+
+    result = asyncio.run(service.train_processing(order.user_id, 7, order))
+
+    assert [[(c.wagon_id, c.seat_id) for c in group] for group in result] == [
+        [(2, 21), (2, 22)]
+    ]
+    # резерв только у выбранной группы
+    assert service.ledger.claimed(7, 1, object()) == set()
+    assert service.ledger.claimed(7, 2, object()) == {21, 22}
@@ -0,0 +1,154 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import Income
+from app.service import BookingService
+from app.settings import settings
+from clients.response_models import GetTrainsResponseModel, SeatRecord
+from clients.train_index import TrainIndex
+
+
+def seat(seat_id: int, num: int, status: str = "FREE") -> SeatRecord:
+    return SeatRecord(
+        seat_id=seat_id, seatNum=str(num), block="A", price=100,
+        bookingStatus=status,
+    )
+
+
+class FakeAxenix:
+    """
+    Подставной клиент: trains - {train_id: {wagon_id: [SeatRecord]}},
+    бронь всегда успешна
+    """
+
+    def __init__(self, trains: dict[int, dict[int, list[SeatRecord]]]):
+        self.trains = trains
+        self.scanned = []
+        self.booked = []
+
+    async def get_trains_index(self, from_: str, to_: str) -> TrainIndex:
+        return TrainIndex([
+            GetTrainsResponseModel(
+                train_id=train_id,
+                startpoint_departure=f"01.01.2030 {hour:02d}:00:00",
+                wagons_info=[], available_seats_count=100,
+            )
+            for hour, train_id in enumerate(self.trains)
+        ])
+
+    async def get_train_by_id(self, train_id: int):
+        return SimpleNamespace(
+            available_seats_count=100,
+            wagons_info=[
+                {"wagon_id": wagon_id, "type": "COUPE"}
+                for wagon_id in self.trains[train_id]
+            ],
+        )
+
+    async def get_wagon_info(self, train_id: int, wagon_id: int):
+        self.scanned.append(train_id)
+        await asyncio.sleep(0)
+        return {"seats": self.trains[train_id][wagon_id]}
+
+    async def booking(self, orders):
+        results = []
+        for order in orders:
+            self.booked.append((order.train_id, order.seat_ids.tolist()))
+            results.append(SimpleNamespace(
+                train_id=order.train_id, wagon_id=order.wagon_id,
+                seat_ids=order.seat_ids.tolist(),
+            ))
+        return results
+
+
+def order(user_id: int = 1, **fields) -> Income:
+    return Income(
+        user_id=user_id, route="A -> B", date_from="01.01.2030 00:00:00",
+        date_to="02.01.2030 00:00:00", **fields,
+    )
+
+
+def free_seats(first: int, count: int) -> list[SeatRecord]:
+    return [seat(first + i, i + 1) for i in range(count)]
+
+
+@pytest.fixture
+def lazy(monkeypatch):
+    monkeypatch.setattr(settings, "WAGON_SCAN_LAZY", True)
+
+
+def test_lazy_scan_continues_until_one_train_has_enough_seats(lazy):
+    client = FakeAxenix({
+        1: {1: free_seats(11, 3)},
+        2: {1: free_seats(21, 2)},
+        3: {1: free_seats(31, 5)},
+    })
+    service = BookingService(client)
+
+    asyncio.run(service.processing_auto(order(seats_qty=5)))
+
+    assert client.booked == [(3, [31, 32, 33, 34, 35])]
+
+
+def test_lazy_scan_stops_at_first_train_with_enough_seats(lazy):
+    client = FakeAxenix({
+        1: {1: free_seats(11, 5)},
+        2: {1: free_seats(21, 5)},
+    })
+    service = BookingService(client)
+
+    asyncio.run(service.processing_auto(order(seats_qty=5)))
+
+    assert client.booked == [(1, [11, 12, 13, 14, 15])]
+    assert 2 not in client.scanned
+
+
+def test_concurrent_nearby_orders_do_not_share_seats(monkeypatch):
+    monkeypatch.setattr(settings, "WAGON_SCAN_LAZY", False)
+    client = FakeAxenix({
+        1: {1: free_seats(11, 4), 2: [seat(21, 1, status="BOOKED")]},
+    })
+    service = BookingService(client)
+
+    async def scenario():
+        first, second = order(1, seats_qty=2, need_nearby=True), order(
+            2, seats_qty=2, need_nearby=True
+        )
+        return await asyncio.gather(
+            service.train_processing(1, 1, first),
+            service.train_processing(2, 1, second),
+        )
+
+    first, second = asyncio.run(scenario())
+    seats_of = lambda result: [c.seat_id for group in result for c in group]
+    assert seats_of(first) == [11, 12]
+    assert seats_of(second) == [13, 14]
+
+
+def test_batch_gives_each_user_seats_from_one_train():
+    client = FakeAxenix({
+        1: {1: free_seats(11, 2)},
+        2: {1: free_seats(21, 3)},
+        3: {1: free_seats(31, 2)},
+    })
+    service = BookingService(client)
+
+    asyncio.run(service.processing_batch([
+        order(1, seats_qty=3), order(2, seats_qty=2),
+    ]))
+
+    assert sorted(client.booked) == [(2, [21, 22, 23]), (3, [31, 32])]
+
+
+def test_batch_falls_back_to_best_partial_train():
+    client = FakeAxenix({
+        1: {1: free_seats(11, 1)},
+        2: {1: free_seats(21, 2)},
+    })
+    service = BookingService(client)
+
+    asyncio.run(service.processing_batch([order(1, seats_qty=3)]))
+
+    assert client.booked == [(2, [21, 22])]
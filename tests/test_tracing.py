@@ -0,0 +1,50 @@
+import asyncio
+import json
+import queue
+
+from app.tracing import NOOP_SPAN, Tracer, traced
+
+
+def test_sampled_trace_is_written_by_background_thread(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer()
+    tracer.configure(str(path), sample_rate=1.0)
+
+    async def scenario():
+        with tracer.trace("consume", user_id=1):
+            with tracer.span("booking"):
+                await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    tracer.close()
+
+    child, root = [json.loads(line) for line in path.read_text().splitlines()]
+    assert (root["name"], root["parent_id"]) == ("consume", None)
+    assert child["name"] == "booking"
+    assert child["parent_id"] == root["span_id"]
+    assert child["trace_id"] == root["trace_id"]
+    assert not tracer.enabled
+
+
+def test_full_queue_drops_traces():
+    tracer = Tracer()
+    tracer._queue = queue.Queue(1)
+    tracer.write([{"name": "first"}])
+    tracer.write([{"name": "second"}])
+
+    assert tracer.dropped == 1
+    assert tracer._queue.get() == [{"name": "first"}]
+
+
+def test_disabled_tracer_creates_no_spans():
+    tracer = Tracer()
+
+    @traced()
+    async def handler():
+        return tracer.span("inner")
+
+    async def scenario():
+        with tracer.trace("consume"):
+            return await handler()
+
+    assert asyncio.run(scenario()) is NOOP_SPAN